@@ -0,0 +1,388 @@
+"""猜单词插件的性能基准测试，不需要安装AstrBot
+
+用法（在插件目录下运行）：
+    python bench/bench_wordle.py                          # 运行全部测试并打印结果
+    python bench/bench_wordle.py --save-baseline base.json   # 保存为基线
+    python bench/bench_wordle.py --compare base.json         # 与基线比较，变慢超过阈值时返回非零
+
+插件仓库没有附带 MinecraftAE.ttf 时，可以用 --font 指定任意 TrueType 字体。
+"""
+
+import argparse
+import asyncio
+import enum
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import statistics
+import string
+import sys
+import time
+import types
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ---- AstrBot的最小替身 ----
+
+class Plain:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class Image:
+    def __init__(self, file: str = None, data: bytes = None):
+        self.file = file
+        self.data = data
+
+    @staticmethod
+    def fromFileSystem(path: str):
+        return Image(file=path)
+
+    @staticmethod
+    def fromBytes(data: bytes):
+        return Image(data=data)
+
+
+class MessageEventResult:
+    def __init__(self, chain: list):
+        self.chain = chain
+
+
+class AstrMessageEvent:
+    def __init__(self, message: str, session_id: str, sender: str = "bench", admin: bool = False):
+        self.message = message
+        self.unified_msg_origin = session_id
+        self.sender = sender
+        self.admin = admin
+        self.is_at_or_wake_command = True
+
+    def get_message_str(self) -> str:
+        return self.message
+
+    def get_sender_name(self) -> str:
+        return self.sender
+
+    def get_sender_id(self) -> str:
+        return self.sender
+
+    def is_admin(self) -> bool:
+        return self.admin
+
+    def plain_result(self, text: str) -> MessageEventResult:
+        return MessageEventResult([Plain(text)])
+
+    def chain_result(self, chain: list) -> MessageEventResult:
+        return MessageEventResult(chain)
+
+
+class Context:
+    pass
+
+
+class Star:
+    def __init__(self, context: Context):
+        self.context = context
+
+
+class EventMessageType(enum.Enum):
+    ALL = "all"
+
+
+def _passthrough_decorator(*args, **kwargs):
+    def decorator(obj):
+        return obj
+    return decorator
+
+
+def install_astrbot_stub():
+    """把替身模块注册为astrbot.api.*，这样main.py可以原样导入"""
+    logger = logging.getLogger("astrbot")
+    api_all = types.ModuleType("astrbot.api.all")
+    for name, value in {
+        "logger": logger,
+        "Plain": Plain,
+        "Image": Image,
+        "AstrMessageEvent": AstrMessageEvent,
+        "Context": Context,
+        "Star": Star,
+        "EventMessageType": EventMessageType,
+        "event_message_type": _passthrough_decorator,
+        "command": _passthrough_decorator,
+        "register": _passthrough_decorator,
+    }.items():
+        setattr(api_all, name, value)
+    api_all.__all__ = [name for name in vars(api_all) if not name.startswith("_")]
+
+    api_event = types.ModuleType("astrbot.api.event")
+    api_event.AstrMessageEvent = AstrMessageEvent
+    api_star = types.ModuleType("astrbot.api.star")
+    api_star.Context, api_star.Star, api_star.register = Context, Star, _passthrough_decorator
+
+    sys.modules.setdefault("astrbot", types.ModuleType("astrbot"))
+    sys.modules.setdefault("astrbot.api", types.ModuleType("astrbot.api"))
+    sys.modules["astrbot.api.all"] = api_all
+    sys.modules["astrbot.api.event"] = api_event
+    sys.modules["astrbot.api.star"] = api_star
+
+
+def load_plugin():
+    install_astrbot_stub()
+    spec = importlib.util.spec_from_file_location("wordle_main", os.path.join(PLUGIN_DIR, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ---- 计时工具 ----
+
+def summarize(samples: list[float]) -> dict:
+    """把以秒为单位的耗时样本汇总成毫秒的p50/p99"""
+    samples = sorted(samples)
+    if not samples:
+        return {"n": 0}
+
+    def percentile(p: float) -> float:
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))] * 1000
+
+    return {
+        "n": len(samples),
+        "p50_ms": round(percentile(50), 4),
+        "p99_ms": round(percentile(99), 4),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4),
+    }
+
+
+async def timed(samples: list[float], coro):
+    start = time.perf_counter()
+    result = await coro
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / 1024 if sys.platform != "darwin" else rss / 1024 / 1024, 1)
+
+
+def random_word(length: int) -> str:
+    return "".join(random.choice(string.ascii_lowercase) for _ in range(length))
+
+
+# ---- 各项测试 ----
+
+async def bench_get_answer(plugin, lengths, iterations) -> dict:
+    results = {}
+    for length in lengths:
+        samples = []
+        for _ in range(iterations):
+            await timed(samples, plugin.get_answer(length))
+        results[str(length)] = summarize(samples)
+    return results
+
+
+async def bench_validation(plugin, iterations) -> dict:
+    words = [plugin.word_bank.pick(5) or "hello" for _ in range(iterations // 2)]
+    words += [random_word(5) for _ in range(iterations - len(words))]
+    cold, warm = [], []
+    plugin.validator.clear_cache()
+    for word in words:
+        start = time.perf_counter()
+        plugin.validator.is_valid(word)
+        cold.append(time.perf_counter() - start)
+    for word in words:
+        start = time.perf_counter()
+        plugin.validator.is_valid(word)
+        warm.append(time.perf_counter() - start)
+    return {"cold": summarize(cold), "cached": summarize(warm)}
+
+
+async def bench_guess_render(main, plugin, lengths, games) -> dict:
+    results = {}
+    for length in lengths:
+        samples = []
+        for _ in range(games):
+            answer = await plugin.get_answer(length)
+            if answer is None:
+                break
+            game = main.WordleGame(answer, plugin.image_format, plugin.font_file, plugin.executor)
+            for _ in range(game.max_attempts):
+                await timed(samples, game.guess(random_word(length).upper()))
+        if samples:
+            results[str(length)] = summarize(samples)
+    return results
+
+
+async def bench_hint(main, plugin, games) -> dict:
+    letters, smart = [], []
+    for _ in range(games):
+        game = main.WordleGame(await plugin.get_answer(5), plugin.image_format, plugin.font_file, plugin.executor)
+        for _ in range(2):
+            await game.guess(random_word(5).upper())
+            await timed(letters, game.hint())
+            if main.HintSolver.available():
+                await timed(smart, plugin.executor.run(plugin.solver.suggest, game))
+    return {"letters": summarize(letters), "smart": summarize(smart)}
+
+
+async def bench_end_to_end(plugin, sessions, guesses) -> dict:
+    """N个并发会话，每个会话开始一局游戏然后连续猜测；另外混入无关的聊天消息"""
+    latencies = []
+
+    async def send(event):
+        start = time.perf_counter()
+        async for _ in plugin.on_message(event):
+            pass
+        latencies.append(time.perf_counter() - start)
+
+    async def session(i: int):
+        session_id = f"bench:group:{i}"
+        await send(AstrMessageEvent("/猜单词 5", session_id))
+        for _ in range(guesses):
+            word = plugin.word_bank.pick(5) or "hello"
+            await send(AstrMessageEvent(word, session_id))
+        await send(AstrMessageEvent("猜单词结束", session_id))
+
+    chatter = []
+
+    async def unrelated(i: int):
+        for _ in range(guesses):
+            start = time.perf_counter()
+            async for _ in plugin.on_message(AstrMessageEvent("今天吃什么", f"bench:chat:{i}")):
+                pass
+            chatter.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)), *(unrelated(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "messages": len(latencies),
+        "throughput_msg_per_s": round(len(latencies) / elapsed, 1),
+        "latency": summarize(latencies),
+        "unrelated_latency": summarize(chatter),
+    }
+
+
+async def run(args) -> dict:
+    logging.basicConfig(level=logging.WARNING)
+    random.seed(args.seed)
+
+    start = time.perf_counter()
+    main = load_plugin()
+    import_s = time.perf_counter() - start
+
+    # 压测会连续猜测，关闭限流，测的是插件本身的处理能力
+    config = {
+        "font_file": args.font or "",
+        "hint_mode": "letters",
+        "guess_rate_per_user": 0,
+        "guess_rate_per_session": 0,
+    }
+    start = time.perf_counter()
+    plugin = main.PluginWordle(Context(), config)
+    init_s = time.perf_counter() - start
+    start = time.perf_counter()
+    await plugin.ensure_word_bank()
+    await plugin.executor.run(plugin.validator.load_spellchecker)
+    warmup_s = time.perf_counter() - start
+
+    lengths = [length for length in range(3, 16) if plugin.word_bank.has_length(length)]
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": main.np is not None,
+            "quick": args.quick,
+        },
+        "startup": {
+            "import_ms": round(import_s * 1000, 2),
+            "init_ms": round(init_s * 1000, 2),
+            "warmup_ms": round(warmup_s * 1000, 2),
+        },
+        "get_answer": await bench_get_answer(plugin, lengths, args.iterations),
+        "validation": await bench_validation(plugin, args.iterations * 10),
+        "guess_render": await bench_guess_render(main, plugin, lengths, args.games),
+        "hint": await bench_hint(main, plugin, args.games),
+        "end_to_end": await bench_end_to_end(plugin, args.sessions, args.guesses),
+    }
+    results["peak_rss_mb"] = peak_rss_mb()
+    await plugin.terminate()
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """把嵌套结果展开成 {"guess_render.5.p99_ms": 1.2, ...}，方便比较"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float = 0.05) -> list[str]:
+    """返回比基线慢（或占用更多内存）超过threshold比例的指标；绝对差值小于min_delta_ms的耗时视为噪声"""
+    current, base = flatten(results), flatten(baseline)
+    regressions = []
+    for name, value in current.items():
+        lower_is_better = name.endswith("_ms") or name.endswith("_mb")
+        if not lower_is_better and not name.endswith("_per_s"):
+            continue
+        old = base.get(name)
+        if not old:
+            continue
+        if name.endswith("_ms") and value - old < min_delta_ms:
+            continue
+        change = (value - old) / old if lower_is_better else (old - value) / old
+        if change > threshold:
+            regressions.append(f"{name}: {old} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--font", help="字体文件路径（默认使用插件配置的默认字体）")
+    parser.add_argument("--iterations", type=int, default=200, help="get_answer等单项测试的重复次数")
+    parser.add_argument("--games", type=int, default=20, help="每个长度模拟的游戏局数")
+    parser.add_argument("--sessions", type=int, default=50, help="端到端测试的并发会话数")
+    parser.add_argument("--guesses", type=int, default=5, help="端到端测试中每个会话的猜测次数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="缩小规模，快速跑一遍")
+    parser.add_argument("--output", help="把结果写入这个JSON文件")
+    parser.add_argument("--save-baseline", metavar="FILE", help="把结果保存为基线")
+    parser.add_argument("--compare", metavar="FILE", help="与基线比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为变慢的比例（默认20%%）")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="小于这个差值的耗时变化视为噪声")
+    args = parser.parse_args()
+    if args.quick:
+        args.iterations, args.games, args.sessions, args.guesses = 20, 2, 10, 3
+
+    results = asyncio.run(run(args))
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    print(text)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        if regressions:
+            print("\n比基线变慢的指标：")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print("\n没有发现变慢的指标。")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,24 @@
+import asyncio
 import os
 import random
 import json
+import functools
+import hashlib
+import heapq
+import importlib.util
+import itertools
+import mmap
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
+from typing import NamedTuple
 
 from PIL import Image as ImageW     # 防止与"Image"发生冲突
 from PIL import ImageDraw, ImageFont
@@ -12,204 +29,1392 @@ from astrbot.api.star import Context, Star, register
 import re
 
 try:
-    os.system("python -m pip install pyspellchecker")    # 过去的版本中，通过requirements.txt的安装方式可能出现异常
-except:
-    logger.info("Pyspellchecker not installed this time.")
-    
-from spellchecker import SpellChecker
+    import numpy as np  # 可选依赖，只用于批量评分
+except ImportError:
+    np = None
+
+# pyspellchecker是可选依赖：只检测是否安装，真正的导入和词典加载在插件注册后于后台进行
+SPELLCHECKER_AVAILABLE = importlib.util.find_spec("spellchecker") is not None
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))  # 获取当前文件所在目录
+
+
+class Metrics:
+    """轻量的性能统计：每个阶段保留最近window次耗时（滚动窗口）用于计算分位数，另有累计次数、总耗时和计数器"""
+
+    def __init__(self, window: int = 512):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+        self._totals: dict[str, list] = {}  # 阶段 -> [累计次数, 累计耗时]
+        self.counters: dict[str, int] = {}
+
+    def observe(self, stage: str, seconds: float):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples.setdefault(stage, deque(maxlen=self.window))
+            self._totals.setdefault(stage, [0, 0.0])
+        samples.append(seconds)
+        totals = self._totals[stage]
+        totals[0] += 1
+        totals[1] += seconds
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def incr(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        """各阶段最近耗时的分位数（毫秒）"""
+        result = {}
+        for stage, samples in list(self._samples.items()):
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            count, total = self._totals[stage]
+
+            def percentile(p: float) -> float:
+                return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+            result[stage] = {
+                "count": count,
+                "total_s": round(total, 6),
+                "p50_ms": percentile(0.5),
+                "p90_ms": percentile(0.9),
+                "p99_ms": percentile(0.99),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+        return result
 
-def re_spell_check(word: str, re_word_list: list):  # 支持正则表达式的自定义单词检查
-    for each_word in re_word_list:
-        if re.search(f'{each_word}',word):
+    def to_prometheus(self, gauges: dict) -> str:
+        """导出为Prometheus文本格式"""
+        lines = [
+            "# HELP wordle_stage_seconds 各阶段耗时（最近窗口内的分位数）",
+            "# TYPE wordle_stage_seconds summary",
+        ]
+        for stage, stats in self.snapshot().items():
+            for quantile, key in (("0.5", "p50_ms"), ("0.9", "p90_ms"), ("0.99", "p99_ms")):
+                lines.append(f'wordle_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key] / 1000}')
+            lines.append(f'wordle_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+            lines.append(f'wordle_stage_seconds_sum{{stage="{stage}"}} {stats["total_s"]}')
+        lines.append("# TYPE wordle_events_total counter")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'wordle_events_total{{event="{name}"}} {value}')
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE wordle_{name} gauge")
+            lines.append(f"wordle_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+class CustomWordMatcher:
+    """支持正则表达式的自定义单词检查
+
+    配置只在变化时编译一次：纯字母的条目放进集合，其余条目合并成一个正则表达式，
+    每次检查最多一次集合查找加一次正则匹配。空条目会被丢弃，否则它会匹配任何单词。
+    """
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.words: set[str] = set()
+        patterns = []
+        for entry in raw.split(";"):
+            entry = entry.strip()
+            if not entry:
+                continue
+            if entry.isascii() and entry.isalpha():
+                self.words.add(entry.lower())
+                continue
+            try:
+                re.compile(entry)
+            except re.error as e:
+                logger.warning(f"自定义单词“{entry}”不是有效的正则表达式，已忽略：{e!s}")
+                continue
+            patterns.append(f"(?:{entry})")
+        self.pattern = re.compile("|".join(patterns)) if patterns else None
+
+    def match(self, word: str) -> bool:
+        if word in self.words:
             return True
+        return self.pattern is not None and self.pattern.search(word) is not None
 
-class WordleGame:
-    def __init__(self, answer: str):
-        self.answer = answer.upper()
-        self.length = len(answer)
-        self.max_attempts = self.length + 1
-        self.guesses: list[str] = []
-        self.feedbacks: list[list[int]] = []
-        self.history_letters: list[str] = []
-        self.history_words: list[str] = []
 
-        self.plugin_dir = os.path.dirname(os.path.abspath(__file__))  # 获取当前文件所在目录
-        self.font_file = os.path.join(self.plugin_dir, "MinecraftAE.ttf")   # 这里可以修改字体为自定义字体
+class WordValidator:
+    """单词校验：词库、拼写检查库、自定义单词三者之一通过即可
+
+    整个插件只创建一个SpellChecker，校验结果用LRU缓存，重复的猜测不会再查一遍。
+    拼写检查库加载完成之前（或者没有安装时），只用词库和自定义单词校验。
+    """
+
+    def __init__(self, word_bank: "WordBank", custom_words: CustomWordMatcher, cache_size: int = 4096):
+        self.word_bank = word_bank
+        self.custom_words = custom_words
+        self._vocabulary = None  # SpellChecker的词频字典，由load_spellchecker()加载
+        self.is_valid = functools.lru_cache(maxsize=cache_size)(self._check)
+
+    @property
+    def spellchecker_ready(self) -> bool:
+        return self._vocabulary is not None
+
+    def load_spellchecker(self) -> bool:
+        """导入pyspellchecker并加载词频字典（耗时较长，应在线程池中调用）"""
+        if self._vocabulary is not None:
+            return True
+        if not SPELLCHECKER_AVAILABLE:
+            logger.warning("未安装pyspellchecker，拼写检查只使用词库和自定义单词。")
+            return False
+        start = time.perf_counter()
+        from spellchecker import SpellChecker
+        self._vocabulary = SpellChecker().word_frequency  # 只加载一次词频字典
+        METRICS.observe("spellchecker_load", time.perf_counter() - start)
+        self.clear_cache()  # 之前没有拼写检查库时得出的结论可能不再成立
+        logger.info(f"拼写检查库加载完成，耗时{time.perf_counter() - start:.3f}秒")
+        return True
+
+    def _check(self, word: str) -> bool:
+        word = word.lower()
+        return bool(
+            self.word_bank.contains(word)   # 在词表中是否找到用户的输入
+            or (self._vocabulary is not None and word in self._vocabulary)     # 在拼写检查库中是否找到用户的输入
+            or self.custom_words.match(word)
+        )
+
+    def set_custom_words(self, custom_words: CustomWordMatcher):
+        self.custom_words = custom_words
+        self.clear_cache()  # 自定义单词变了，之前的结论可能不再成立
+
+    def cache_info(self):
+        return self.is_valid.cache_info()
+
+    def clear_cache(self):
+        self.is_valid.cache_clear()
+
+
+WORDBANK_MAGIC = b"WDLB"
+WORDBANK_VERSION = 4
+_WORDBANK_HEAD = struct.Struct("<4sII")  # 魔数、版本号、头部JSON的字节数
+_WORDBANK_OFFSET = struct.Struct("<I")
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _file_sha1(path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def iter_json_object(path: str, chunk_size: int = 1 << 16):
+    """逐条读取顶层为对象的JSON文件，依次产生(键, 值)，整个文件不会一次性读入内存
+
+    格式有误时抛出ValueError（此前已经产生的条目不受影响）。
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        buf, pos, eof = "", 0, False
+
+        def more() -> bool:
+            """读入下一块，丢掉已经解析过的部分"""
+            nonlocal buf, pos, eof
+            chunk = "" if eof else f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf, pos = buf[pos:] + chunk, 0
+            return True
 
-        self._font = ImageFont.truetype(self.font_file, 40)  #设定字体、字号、字重
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                pos = _JSON_WHITESPACE.match(buf, pos).end()
+                if pos < len(buf) or not more():
+                    return
 
-    async def gen_image(self) -> bytes:
-        CELL_COLORS = {
-            2: (106, 170, 100),
-            1: (201, 180, 88),
-            0: (120, 124, 126),
-            -1: (211, 214, 218),
+        def token() -> str:
+            nonlocal pos
+            skip_whitespace()
+            if pos >= len(buf):
+                raise ValueError("文件意外结束")
+            pos += 1
+            return buf[pos - 1]
+
+        def value():
+            nonlocal pos
+            skip_whitespace()
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if more():
+                        continue    # 值可能被块边界截断了，读入更多再试
+                    raise
+                if end < len(buf) or not more():    # 值恰好在块末尾结束时（比如数字）可能还没读完
+                    pos = end
+                    return obj
+
+        if token() != "{":
+            raise ValueError("词表的顶层应该是一个对象")
+        skip_whitespace()
+        if buf[pos:pos + 1] == "}":
+            return
+        while True:
+            key = value()
+            if not isinstance(key, str) or token() != ":":
+                raise ValueError(f"“{key}”附近的格式有误")
+            yield key, value()
+            separator = token()
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"“{key}”之后的格式有误")
+
+
+def normalize_entry(word, info):
+    """校验并规范化词表中的一条：单词转为小写且只能由英文字母组成，释义只保留字符串字段；无效时返回None"""
+    if not isinstance(word, str):
+        return None
+    word = word.strip().lower()
+    if not (word.isascii() and word.isalpha()):
+        return None
+    if isinstance(info, str):
+        info = {"中释": info}
+    elif isinstance(info, dict):
+        info = {key: value for key, value in info.items() if isinstance(value, str)}
+    else:
+        info = {}
+    return word, info
+
+
+def write_word_index(out, sources: dict, entries):
+    """把按(长度, 单词)排好序的(单词, 释义JSON字节)写成二进制索引
+
+    布局：文件头 | 头部JSON | 按长度分组、组内排好序的定长单词 | 释义偏移表 | 释义数据
+    释义先写入临时文件，内存中只保留定长单词和偏移表。
+    """
+    words = bytearray()
+    offsets = bytearray()
+    lengths = {}
+    count = 0
+    blob_size = 0
+    with tempfile.TemporaryFile() as blob:
+        for word, data in entries:
+            bucket = lengths.setdefault(str(len(word)), [0, len(words), count])
+            bucket[0] += 1
+            words += word.encode("ascii")
+            offsets += _WORDBANK_OFFSET.pack(blob_size)
+            blob.write(data)
+            blob_size += len(data)
+            count += 1
+        offsets += _WORDBANK_OFFSET.pack(blob_size)
+
+        # 各区段的位置都相对于头部JSON之后的数据起点
+        header = {
+            "sources": sources,
+            "lengths": lengths,
+            "count": count,
+            "offsets_at": len(words),
+            "blob_at": len(words) + len(offsets),
         }
-        BACKGROUND_COLOR = (255, 255, 255)
-        TEXT_COLOR = (255, 255, 255)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+        out.write(_WORDBANK_HEAD.pack(WORDBANK_MAGIC, WORDBANK_VERSION, len(header_bytes)))
+        out.write(header_bytes)
+        out.write(words)
+        out.write(offsets)
+        blob.seek(0)
+        shutil.copyfileobj(blob, out)
+
+
+def _read_header(buf) -> dict:
+    magic, version, header_len = _WORDBANK_HEAD.unpack_from(buf, 0)
+    if magic != WORDBANK_MAGIC or version != WORDBANK_VERSION:
+        raise ValueError("词库索引格式不匹配")
+    data_at = _WORDBANK_HEAD.size + header_len
+    header = json.loads(bytes(buf[_WORDBANK_HEAD.size:data_at]))
+    header["data_at"] = data_at
+    return header
+
+
+class WordIndex:
+    """编译好的索引（整个词库，或单个词表编译出的段）的只读视图"""
+
+    def __init__(self, buf):
+        self.buf = buf  # mmap对象；索引文件无法写入时为bytes
+        self.header = _read_header(buf)
+        self.lengths: dict[int, tuple[int, int, int]] = {
+            int(k): tuple(v) for k, v in self.header["lengths"].items()
+        }   # 单词长度 -> (数量, 区段内偏移, 起始序号)
+        self.count: int = self.header["count"]
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+
+    def word_at(self, length: int, i: int) -> bytes:
+        _, offset, _ = self.lengths[length]
+        start = self.header["data_at"] + offset + i * length
+        return self.buf[start:start + length]
+
+    def iter_words(self, length: int, order: int):
+        """依次产生(单词, order, 组内序号)，用于多个段的归并"""
+        for i in range(self.lengths[length][0]):
+            yield self.word_at(length, i), order, i
+
+    def index_of(self, word: str):
+        """二分查找（已规范化的）单词，返回其全局序号，找不到时返回None"""
+        length = len(word)
+        if length not in self.lengths:
+            return None
+        target = word.encode("ascii")
+        count, _, first = self.lengths[length]
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.word_at(length, mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < count and self.word_at(length, lo) == target:
+            return first + lo
+        return None
+
+    def words(self, length: int) -> list[str]:
+        if length not in self.lengths:
+            return []
+        count, offset, _ = self.lengths[length]
+        start = self.header["data_at"] + offset
+        data = bytes(self.buf[start:start + count * length]).decode("ascii")
+        return [data[i:i + length] for i in range(0, len(data), length)]
+
+    def blob(self, index: int) -> bytes:
+        """全局序号对应的释义JSON"""
+        data_at = self.header["data_at"]
+        offsets_at = data_at + self.header["offsets_at"] + index * _WORDBANK_OFFSET.size
+        start, = _WORDBANK_OFFSET.unpack_from(self.buf, offsets_at)
+        end, = _WORDBANK_OFFSET.unpack_from(self.buf, offsets_at + _WORDBANK_OFFSET.size)
+        blob_at = data_at + self.header["blob_at"]
+        return bytes(self.buf[blob_at + start:blob_at + end])
+
+
+class AnswerInfo(NamedTuple):
+    """答案及其释义，随游戏保存，不同会话之间互不影响"""
+    word: str
+    zh: str = ""    # 中释
+    en: str = ""    # 英释
+    source: str = ""    # 来自哪个词表
+
+
+class WordBank:
+    """词库：wordlist目录中的每个词表被流式解析并编译成一个段，各段再归并为一个二进制索引，运行时通过mmap只读访问
+
+    索引中的单词按长度分组且定长存放，随机抽取是O(1)的下标访问，查询单词是二分查找；
+    释义只在需要时才解码。词表文件增删改后（包括运行中的热重载），只有变化的文件会被重新解析，
+    其余词表直接复用已编译的段；格式有误的词表会被跳过，不影响其他词表。
+    """
+
+    def __init__(self, wordlist_path: str, cache_file: str):
+        self.wordlist_path = wordlist_path
+        self.cache_file = cache_file
+        self.segment_dir = f"{os.path.splitext(cache_file)[0]}_segments"
+        self.generation = 0 # 每次加载后加一，依赖单词序号的缓存据此失效
+        self._index: WordIndex = None
+        self._lock = threading.Lock()   # 后台热重载与首次加载不要同时编译
+
+    def _scan_sources(self) -> dict:
+        sources = {}
+        if not os.path.isdir(self.wordlist_path):
+            return sources  # 没有词表目录时词库为空，开始游戏时会提示找不到单词
+        for word_file in os.listdir(self.wordlist_path):
+            if word_file.endswith(".json"):
+                stat = os.stat(os.path.join(self.wordlist_path, word_file))
+                sources[word_file] = [stat.st_mtime_ns, stat.st_size, None]
+        return sources
+
+    def _is_fresh(self, header: dict, sources: dict) -> bool:
+        cached = header.get("sources", {})
+        if set(cached) != set(sources):
+            return False
+        for word_file, (mtime_ns, size, _) in sources.items():
+            cached_mtime_ns, cached_size, cached_sha1 = cached[word_file]
+            if (mtime_ns, size) == (cached_mtime_ns, cached_size):
+                continue
+            # 修改时间变了但内容没变（比如被复制过），以哈希为准
+            if _file_sha1(os.path.join(self.wordlist_path, word_file)) != cached_sha1:
+                return False
+            cached[word_file] = [mtime_ns, size, cached_sha1]   # 记住新的修改时间，热重载检查时不必再算哈希
+        return True
 
-        CELL_SIZE = 60
-        CELL_MARGIN = 5
-        GRID_MARGIN = 5
+    @staticmethod
+    def _open_cache(path: str):
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-        cell_stride = CELL_SIZE + CELL_MARGIN
-        width = GRID_MARGIN * 2 + cell_stride * self.length - CELL_MARGIN
-        height = GRID_MARGIN * 2 + cell_stride * self.max_attempts - CELL_MARGIN
+    def _write_cache(self, path: str, sources: dict, entries) -> WordIndex:
+        """写入索引文件并用mmap打开；文件无法写入时退化为只在内存中使用。entries是产生条目的函数"""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_file, "wb") as f:
+                write_word_index(f, sources, entries())
+            os.replace(tmp_file, path)  # 原子替换，旧的mmap仍然有效
+            return WordIndex(self._open_cache(path))
+        except OSError as e:
+            logger.warning(f"词库索引写入失败，本次仅在内存中使用：{e!s}")
+            out = BytesIO()
+            write_word_index(out, sources, entries())
+            return WordIndex(out.getvalue())
+
+    def _segment_file(self, word_file: str, sha1: str) -> str:
+        # 段的内容取决于文件名（释义中的来源）和文件内容
+        name = hashlib.sha1(f"{word_file}\0{sha1}".encode("utf-8")).hexdigest()
+        return os.path.join(self.segment_dir, f"{name}.seg")
+
+    def _build_segment(self, word_file: str, segment_file: str) -> WordIndex:
+        """流式解析一个词表文件，校验、规范化后编译为段"""
+        source = os.path.splitext(word_file)[0]
+        positions: dict[str, tuple[int, int]] = {}  # 单词 -> 释义在临时文件中的(位置, 长度)
+        skipped = 0
+        with tempfile.TemporaryFile() as blobs:
+            for word, info in iter_json_object(os.path.join(self.wordlist_path, word_file)):
+                entry = normalize_entry(word, info)
+                if entry is None:
+                    skipped += 1
+                    continue
+                word, info = entry
+                data = json.dumps(dict(info, 来源=source), ensure_ascii=False).encode("utf-8")
+                positions[word] = (blobs.tell(), len(data))    # 同一词表中重复的单词以最后一条为准
+                blobs.write(data)
+
+            def entries():
+                for word in sorted(positions, key=lambda word: (len(word), word)):
+                    start, size = positions[word]
+                    blobs.seek(start)
+                    yield word, blobs.read(size)
+
+            segment = self._write_cache(segment_file, {word_file: None}, entries)
+        if skipped:
+            logger.warning(f"词表{word_file}中有{skipped}个条目不是有效的英文单词，已忽略。")
+        logger.info(f"词表{word_file}已编译，共{segment.count}个单词")
+        return segment
+
+    def _segment(self, word_file: str, signature: list):
+        """词表对应的段：内容没变时直接打开之前编译的段文件；词表有误时返回None"""
+        try:
+            if signature[2] is None:
+                signature[2] = _file_sha1(os.path.join(self.wordlist_path, word_file))
+            segment_file = self._segment_file(word_file, signature[2])
+            try:
+                return WordIndex(self._open_cache(segment_file))
+            except (OSError, ValueError, struct.error):
+                return self._build_segment(word_file, segment_file)
+        except (OSError, ValueError) as e:
+            logger.error(f"词表{word_file}读取失败，已跳过：{e!s}")
+            return None
 
-        image = ImageW.new("RGB", (width, height), BACKGROUND_COLOR)
-        draw = ImageDraw.Draw(image)
+    def _merge(self, segments: list[WordIndex], sources: dict) -> WordIndex:
+        """把各段按(长度, 单词)归并成完整的索引；同一个单词以排在后面的词表为准，与过去的行为一致"""
+        def entries():
+            for length in sorted({length for segment in segments for length in segment.lengths}):
+                streams = [
+                    segment.iter_words(length, order)
+                    for order, segment in enumerate(segments) if length in segment.lengths
+                ]
+                for word, group in itertools.groupby(heapq.merge(*streams), key=lambda item: item[0]):
+                    for _, order, i in group:
+                        pass
+                    segment = segments[order]
+                    yield word.decode("ascii"), segment.blob(segment.lengths[length][2] + i)
+
+        return self._write_cache(self.cache_file, sources, entries)
+
+    def _remove_stale_segments(self, sources: dict):
+        keep = {
+            os.path.basename(self._segment_file(word_file, sha1))
+            for word_file, (_, _, sha1) in sources.items() if sha1
+        }
+        try:
+            names = os.listdir(self.segment_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(".seg") and name not in keep:
+                try:
+                    os.remove(os.path.join(self.segment_dir, name))
+                except OSError:
+                    pass
+
+    def _build(self, sources: dict, cached: dict) -> WordIndex:
+        """重新编译索引：修改时间和大小都没变的词表沿用上次的哈希，从而直接复用已编译的段"""
+        start = time.perf_counter()
+        segments = []
+        for word_file in sorted(sources):
+            signature = sources[word_file]
+            old = cached.get(word_file)
+            if old and old[:2] == signature[:2]:
+                signature[2] = old[2]
+            segment = self._segment(word_file, signature)
+            if segment is not None:
+                segments.append(segment)
+        index = self._merge(segments, sources)
+        for segment in segments:
+            segment.close()
+        self._remove_stale_segments(sources)
+        logger.info(f"词库索引已重新编译，耗时{time.perf_counter() - start:.3f}秒")
+        return index
+
+    def _load(self) -> WordIndex:
+        sources = self._scan_sources()
+        cached = {}
+        try:
+            index = WordIndex(self._open_cache(self.cache_file))
+            if self._is_fresh(index.header, sources):
+                return index
+            cached = index.header.get("sources", {})
+            index.close()
+        except (OSError, ValueError, struct.error) as e:
+            logger.info(f"词库索引不可用，将重新编译：{e!s}")
+        return self._build(sources, cached)
+
+    def _install(self, index: WordIndex):
+        # 只替换一个属性，其他线程读到的要么是完整的旧索引，要么是完整的新索引；
+        # 旧的mmap可能还在被读取，不主动关闭，没有引用后自然释放
+        self._index = index
+        self.generation += 1
+        logger.info(f"词库加载完成，共{index.count}个单词，可用长度：{sorted(index.lengths)}")
+
+    def load(self):
+        with METRICS.timer("wordbank_load"), self._lock:
+            self._install(self._load())
+
+    def reload_if_changed(self) -> bool:
+        """热重载：词表文件有增删改时增量重建索引，返回是否重新加载（应在线程池中调用）"""
+        index = self._index
+        if index is None:
+            return False    # 还没有加载过，第一次使用时自然会读到最新的词表
+        sources = self._scan_sources()
+        if self._is_fresh(index.header, sources):
+            return False
+        logger.info("词表文件有变化，正在更新词库……")
+        with METRICS.timer("wordbank_reload"), self._lock:
+            self._install(self._build(sources, index.header.get("sources", {})))
+        return True
+
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None
 
-        for row in range(self.max_attempts):
-            y = GRID_MARGIN + row * cell_stride
+    def stats(self) -> dict:
+        index = self._index
+        if index is None:
+            return {"words": 0, "index_bytes": 0}
+        return {"words": index.count, "index_bytes": len(index.buf)}
 
-            for col in range(self.length):
-                x = GRID_MARGIN + col * cell_stride
+    def ensure_loaded(self):
+        if self._index is None:
+            self.load()
 
-                if row < len(self.guesses) and col < len(self.guesses[row]):
-                    letter = self.guesses[row][col].upper()
-                    feedback_value = self.feedbacks[row][col]
-                    cell_color = CELL_COLORS[feedback_value]
-                else:
-                    letter = ""
-                    cell_color = CELL_COLORS[-1]
+    def _current(self) -> WordIndex:
+        self.ensure_loaded()
+        return self._index
 
-                draw.rectangle(
-                    [x, y, x + CELL_SIZE, y + CELL_SIZE], fill=cell_color, outline=None
-                )
+    def lengths(self) -> list[int]:
+        return sorted(self._current().lengths)
+
+    def has_length(self, length: int) -> bool:
+        return length in self._current().lengths
+
+    def contains(self, word: str) -> bool:
+        if not (word.isascii() and word.isalpha()):
+            return False
+        return self._current().index_of(word.lower()) is not None
+
+    def words(self, length: int) -> list[str]:
+        """对应长度的全部单词（已排序）"""
+        return self._current().words(length)
+
+    def pick(self, length: int, seed: int = None):
+        """从对应长度的单词中随机取一个，给定seed时结果固定；不存在该长度时返回None"""
+        index = self._current()
+        if length not in index.lengths:
+            return None
+        count = index.lengths[length][0]
+        i = random.randrange(count) if seed is None else seed % count
+        return index.word_at(length, i).decode("ascii")
+
+    def definition(self, word: str) -> dict:
+        """解码单词的释义（{"中释": ..., "英释": ..., "来源": ...}），找不到时返回空字典"""
+        if not (word.isascii() and word.isalpha()):
+            return {}
+        index = self._current()
+        i = index.index_of(word.lower())
+        if i is None:
+            return {}
+        return json.loads(index.blob(i).decode("utf-8"))
+
+    def answer_info(self, word: str) -> AnswerInfo:
+        info = self.definition(word)
+        return AnswerInfo(word.upper(), info.get("中释", ""), info.get("英释", ""), info.get("来源", ""))
+
+
+IMAGE_FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG"}
+
+
+def encode_image(image, image_format: str = "JPEG") -> bytes:
+    """把PIL图片直接编码成字节，不经过磁盘"""
+    with METRICS.timer("encode"), BytesIO() as output:
+        if image_format == "JPEG":
+            image.save(output, format="JPEG", quality=95)   # QQ等平台对png兼容不好，默认用jpg
+        else:
+            image.save(output, format=image_format)
+        return output.getvalue()
+
+
+class RenderResources:
+    """进程内共享的绘制资源：字体、颜色表、布局常量，以及画好的格子和空棋盘底图
+
+    字体按（路径、字号）只加载一次，所有游戏共用同一个字体对象。
+    """
+
+    CELL_COLORS = {
+        2: (106, 170, 100),
+        1: (201, 180, 88),
+        0: (120, 124, 126),
+        -1: (211, 214, 218),
+    }
+    BACKGROUND_COLOR = (255, 255, 255)
+    TEXT_COLOR = (255, 255, 255)
+
+    CELL_SIZE = 60
+    CELL_MARGIN = 5
+    GRID_MARGIN = 5
+    CELL_STRIDE = CELL_SIZE + CELL_MARGIN
+
+    FONT_SIZE = 40
+    DEFAULT_FONT_FILE = os.path.join(PLUGIN_DIR, "MinecraftAE.ttf")   # 可以在配置中指定其他字体
+
+    def __init__(self):
+        self._fonts: dict[tuple, ImageFont.FreeTypeFont] = {}
+        self._tiles: dict[tuple, ImageW.Image] = {}
+        self._canvases: dict[tuple, ImageW.Image] = {}
+
+    def font(self, font_file: str = None, size: int = FONT_SIZE) -> ImageFont.FreeTypeFont:
+        """按（路径、字号）取字体，自定义字体加载失败时退回默认字体"""
+        font_file = font_file or self.DEFAULT_FONT_FILE
+        if not os.path.isabs(font_file):
+            font_file = os.path.join(PLUGIN_DIR, font_file)
+        key = (font_file, size)
+        font = self._fonts.get(key)
+        if font is None:
+            try:
+                font = ImageFont.truetype(font_file, size)  #设定字体、字号、字重
+            except OSError as e:
+                if font_file == self.DEFAULT_FONT_FILE:
+                    raise
+                logger.warning(f"字体{font_file}加载失败，使用默认字体：{e!s}")
+                font = self.font(None, size)
+            self._fonts[key] = font
+        return font
+
+    def tile(self, letter: str, feedback: int, font: ImageFont.FreeTypeFont) -> ImageW.Image:
+        """取一个画好字母的格子，按（字母、反馈颜色、格子大小、字体）缓存"""
+        cell_color = self.CELL_COLORS[feedback]
+        key = (letter, cell_color, self.CELL_SIZE, getattr(font, "path", None), getattr(font, "size", None))
+        tile = self._tiles.get(key)
+        METRICS.incr("tile_cache.hit" if tile is not None else "tile_cache.miss")
+        if tile is None:
+            tile = ImageW.new("RGB", (self.CELL_SIZE + 1, self.CELL_SIZE + 1), cell_color)  # 与draw.rectangle的闭区间一致
+            if letter.strip():
+                draw = ImageDraw.Draw(tile)
+                text_bbox = draw.textbbox((0, 0), letter, font=font)
+                text_width = text_bbox[2] - text_bbox[0]
+                text_height = text_bbox[3] - text_bbox[1]
+
+                letter_x = (self.CELL_SIZE - text_width) // 2 + 2.5
+                letter_y = (self.CELL_SIZE - text_height) // 2 + 1
+
+                draw.text((letter_x, letter_y), letter, fill=self.TEXT_COLOR, font=font)
+            self._tiles[key] = tile
+        return tile
+
+    def base_canvas(self, cols: int, rows: int) -> ImageW.Image:
+        """取一张只有空格子的棋盘底图（共享对象，使用前请copy()）"""
+        key = (cols, rows)
+        canvas = self._canvases.get(key)
+        if canvas is None:
+            width = self.GRID_MARGIN * 2 + self.CELL_STRIDE * cols - self.CELL_MARGIN
+            height = self.GRID_MARGIN * 2 + self.CELL_STRIDE * rows - self.CELL_MARGIN
+            canvas = ImageW.new("RGB", (width, height), self.BACKGROUND_COLOR)
+            draw = ImageDraw.Draw(canvas)
+            for row in range(rows):
+                y = self.GRID_MARGIN + row * self.CELL_STRIDE
+                for col in range(cols):
+                    x = self.GRID_MARGIN + col * self.CELL_STRIDE
+                    draw.rectangle(
+                        [x, y, x + self.CELL_SIZE, y + self.CELL_SIZE], fill=self.CELL_COLORS[-1], outline=None
+                    )
+            self._canvases[key] = canvas
+        return canvas
+
+    def cell_origin(self, row: int, col: int) -> tuple[int, int]:
+        return (self.GRID_MARGIN + col * self.CELL_STRIDE, self.GRID_MARGIN + row * self.CELL_STRIDE)
+
+
+RENDER_RESOURCES = RenderResources()
+
+
+class ImageCache:
+    """已编码图片的LRU缓存：内容相同（同样的提示、同样的棋盘）时直接返回编码好的字节
+
+    按总字节数限制大小，绘制在线程池中进行，所以需要加锁。
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._images: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            data = self._images.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: tuple, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._images[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+
+IMAGE_CACHE = ImageCache()
 
-                if letter:
-                    text_bbox = draw.textbbox((0, 0), letter, font=self._font)
-                    text_width = text_bbox[2] - text_bbox[0]
-                    text_height = text_bbox[3] - text_bbox[1]
 
-                    letter_x = x + (CELL_SIZE - text_width) // 2 + 2.5
-                    letter_y = y + (CELL_SIZE - text_height) // 2 + 1
+class RenderBusyError(RuntimeError):
+    """绘制队列已满"""
 
-                    draw.text((letter_x, letter_y), letter, fill=TEXT_COLOR, font=self._font)
 
-        with BytesIO() as output:
-            image.save(output, format="PNG")
-            return output.getvalue()
+class RenderExecutor:
+    """有界线程池：绘制、编码以及阻塞的文件读写都放到事件循环之外执行
 
-    async def gen_image_hint(self,word) -> bytes:    # 与gen_image()相似，但需要传参
-        CELL_COLORS = {
-            2: (106, 170, 100),
-            1: (201, 180, 88),
-            0: (120, 124, 126),
-            -1: (211, 214, 218),
+    同时执行的任务不超过max_workers个，另有最多max_queue个任务排队；
+    队列满时直接抛出RenderBusyError，而不是让请求无限堆积。
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 16):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="wordle-render")
+        self._pending = 0   # 正在执行和排队中的任务数
+        self.peak_queue_depth = 0
+        self.submitted = 0
+        self.rejected = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.max_workers)
+
+    async def run(self, func, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            logger.warning(f"绘制队列已满（{self.queue_depth}/{self.max_queue}），拒绝新的任务。")
+            raise RenderBusyError("绘制队列已满")
+        self._pending += 1
+        self.submitted += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.queue_depth)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(func, *args))
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "in_flight": min(self._pending, self.max_workers),
+            "queue_depth": self.queue_depth,
+            "queue_size": self.max_queue,
+            "peak_queue_depth": self.peak_queue_depth,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
         }
-        BACKGROUND_COLOR = (255, 255, 255)
-        TEXT_COLOR = (255, 255, 255)
 
-        CELL_SIZE = 60
-        CELL_MARGIN = 5
-        GRID_MARGIN = 5
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
 
-        cell_stride = CELL_SIZE + CELL_MARGIN
-        width = GRID_MARGIN * 2 + cell_stride * self.length - CELL_MARGIN
-        height = GRID_MARGIN * 2 + cell_stride * 1 - CELL_MARGIN
 
-        image = ImageW.new("RGB", (width, height), BACKGROUND_COLOR)
-        draw = ImageDraw.Draw(image)
+async def run_blocking(executor: RenderExecutor, func, *args):
+    """有线程池时放到线程池执行，否则直接执行"""
+    if executor is None:
+        return func(*args)
+    return await executor.run(func, *args)
 
-        for row in range(1):
-            y = GRID_MARGIN + row * cell_stride
 
-            for col in range(self.length):
-                x = GRID_MARGIN + col * cell_stride
+# ---- 评分 ----
+# 字母统一编码为0~25，其他字符（理论上不会出现）共用26号
+LETTER_SLOTS = 27
 
-                if word[col] == " ":
-                    cell_color = CELL_COLORS[-1]
+
+def letter_index(char: str) -> int:
+    code = ord(char) - 65
+    return code if 0 <= code < 26 else 26
+
+
+def letter_counts(word: str) -> list[int]:
+    """大写单词中每个字母出现的次数（定长数组）"""
+    counts = [0] * LETTER_SLOTS
+    for char in word:
+        counts[letter_index(char)] += 1
+    return counts
+
+
+def score_guess(guess: str, answer: str) -> list[int]:
+    """给一次猜测打分：2为位置正确，1为字母存在但位置不对，0为不存在（参数均为大写）"""
+    length = len(answer)
+    feedback = [0] * length
+    remaining = [0] * LETTER_SLOTS  # 答案中没有被绿色格子用掉的字母数量
+
+    for i in range(length):
+        if guess[i] == answer[i]:
+            feedback[i] = 2
+        else:
+            remaining[letter_index(answer[i])] += 1
+
+    for i in range(length):
+        if feedback[i] != 2:
+            code = letter_index(guess[i])
+            if remaining[code] > 0:
+                feedback[i] = 1
+                remaining[code] -= 1
+
+    return feedback
+
+
+def feedback_code(feedback) -> int:
+    """把一行反馈编码成一个整数（三进制），便于比较和统计"""
+    code = 0
+    for value in reversed(feedback):
+        code = code * 3 + int(value)
+    return code
+
+
+def encode_words(words) -> "np.ndarray":
+    """把等长的单词编码成(N, 长度)的uint8矩阵"""
+    if np is None:
+        raise ImportError("批量评分需要安装numpy")
+    words = [word.upper() for word in words]
+    if not words:
+        return np.zeros((0, 0), dtype=np.uint8)
+    # 非ASCII字母（拼写检查库中有cafés之类的词）编码为“?”，与letter_index()一样归入26号
+    matrix = np.frombuffer("".join(words).encode("ascii", "replace"), dtype=np.uint8).reshape(len(words), -1) - 65
+    return np.where(matrix < 26, matrix, 26).astype(np.uint8)
+
+
+def score_matrix(guesses: "np.ndarray", answers: "np.ndarray") -> "np.ndarray":
+    """向量化评分：guesses和answers都是encode_words()的结果，行数相同或其中一个只有一行
+
+    返回(N, 长度)的int8反馈矩阵，规则与score_guess()完全一致；只在单词长度这一维上循环。
+    """
+    guesses, answers = np.broadcast_arrays(np.atleast_2d(guesses), np.atleast_2d(answers))
+    rows = np.arange(guesses.shape[0])
+    green = guesses == answers
+    feedback = green.astype(np.int8) * 2
+
+    remaining = np.zeros((guesses.shape[0], LETTER_SLOTS), dtype=np.int16)
+    for col in range(guesses.shape[1]):
+        remaining[rows, answers[:, col]] += ~green[:, col]  # 每列中每行只出现一次，可以直接用花式索引累加
+
+    for col in range(guesses.shape[1]):
+        letters = guesses[:, col]
+        yellow = ~green[:, col] & (remaining[rows, letters] > 0)
+        feedback[yellow, col] = 1
+        remaining[rows[yellow], letters[yellow]] -= 1
+
+    return feedback
+
+
+def feedback_codes(feedback: "np.ndarray") -> "np.ndarray":
+    """feedback_code()的批量版本"""
+    weights = 3 ** np.arange(feedback.shape[1], dtype=np.int64)
+    return feedback.astype(np.int64) @ weights
+
+
+def score_many(words, answer: str) -> list[int]:
+    """一次给许多候选单词打分，返回每个单词的反馈编码；有numpy时向量化计算"""
+    if np is None:
+        answer = answer.upper()
+        return [feedback_code(score_guess(word.upper(), answer)) for word in words]
+    return feedback_codes(score_matrix(encode_words(words), encode_words([answer]))).tolist()
+
+
+class HintSolver:
+    """“最佳下一步”提示：在同长度的单词中找出期望信息量最大的猜测
+
+    每个长度的反馈表（猜测词 × 该长度的全部单词）按行懒加载，每行只计算一次并在所有会话间共享，
+    缓存按字节数限制大小；每局游戏只保存仍与已有反馈相符的候选答案下标，每次猜测后增量过滤。需要numpy。
+    """
+
+    BATCH_CELLS = 1 << 20   # 批量计算反馈行时，一批最多计算多少个(猜测词, 答案)组合，限制临时内存
+
+    def __init__(self, word_bank: WordBank, max_guesses: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.word_bank = word_bank
+        self.max_guesses = max_guesses  # 每次提示最多评估多少个猜测词
+        self.max_bytes = max_bytes  # 反馈表缓存最多占用多少字节
+        self._buckets: dict[int, tuple[list[str], dict[str, int], "np.ndarray"]] = {}
+        self._rows: OrderedDict[tuple[int, str], "np.ndarray"] = OrderedDict()
+        self._bytes = 0
+        self._generation = word_bank.generation  # 词库热重载后单词序号会变，缓存随之失效
+        self._lock = threading.Lock()   # 提示在线程池中计算，缓存需要加锁
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    def _bucket(self, length: int):
+        if self._generation != self.word_bank.generation:
+            with self._lock:
+                self._buckets.clear()
+                self._rows.clear()
+                self._bytes = 0
+                self._generation = self.word_bank.generation
+        bucket = self._buckets.get(length)
+        if bucket is None:
+            words = [word.upper() for word in self.word_bank.words(length)]
+            bucket = (words, {word: i for i, word in enumerate(words)}, encode_words(words))
+            self._buckets[length] = bucket
+        return bucket
+
+    def rows(self, length: int, guesses: list[str]) -> list["np.ndarray"]:
+        """取若干猜测词对该长度全部单词的反馈编码行，缺失的行一次性批量计算"""
+        _, _, matrix = self._bucket(length)
+        with self._lock:
+            missing = [guess for guess in dict.fromkeys(guesses) if (length, guess) not in self._rows]
+        computed = {}
+        dtype = np.int32 if 3 ** length < 2 ** 31 else np.int64    # 反馈编码最大为3**长度-1
+        batch = max(1, self.BATCH_CELLS // max(1, len(matrix)))
+        for i in range(0, len(missing), batch):
+            chunk = missing[i:i + batch]
+            guess_matrix = np.repeat(encode_words(chunk), len(matrix), axis=0)
+            answer_matrix = np.tile(matrix, (len(chunk), 1))
+            codes = feedback_codes(score_matrix(guess_matrix, answer_matrix)).astype(dtype)
+            computed.update(zip(chunk, codes.reshape(len(chunk), len(matrix))))
+        with self._lock:
+            for guess, row in computed.items():
+                if (length, guess) not in self._rows:
+                    self._rows[(length, guess)] = row
+                    self._bytes += row.nbytes
+            result = []
+            for guess in guesses:
+                row = self._rows.get((length, guess))
+                if row is None:
+                    row = computed[guess]   # 本次调用中已被淘汰，直接使用刚算出的结果
                 else:
-                    cell_color = CELL_COLORS[2]
-                letter = word[col]
+                    self._rows.move_to_end((length, guess))
+                result.append(row)
+            while self._bytes > self.max_bytes and self._rows:
+                self._bytes -= self._rows.popitem(last=False)[1].nbytes
+        return result
+
+    def candidates(self, game: "WordleGame") -> "np.ndarray":
+        """与这局游戏所有反馈都相符的候选答案下标；只用上次之后新增的猜测过滤"""
+        if game._candidates is None or game._candidates_generation != self.word_bank.generation:
+            game._candidates = np.arange(len(self._bucket(game.length)[0]))
+            game._candidates_generation = self.word_bank.generation
+            game._filtered_rows = 0
+        # 提示在线程池中计算，期间事件循环可能又记录了新的猜测：只处理开始时已有的猜测，新的留到下次
+        start = game._filtered_rows
+        end = min(len(game.guesses), len(game.feedbacks))
+        if end > start:
+            new_guesses = game.guesses[start:end]
+            candidates = game._candidates
+            for row, feedback in zip(self.rows(game.length, new_guesses), game.feedbacks[start:end]):
+                candidates = candidates[row[candidates] == feedback_code(feedback)]
+            game._candidates, game._filtered_rows = candidates, end
+        return game._candidates
+
+    def suggest(self, game: "WordleGame") -> tuple[str, int]:
+        """返回(建议的猜测词, 剩余候选答案数)；没有候选答案时（比如答案已不在词库中）返回(None, 0)"""
+        words, _, _ = self._bucket(game.length)
+        candidates = self.candidates(game)
+        if len(candidates) == 0:
+            return None, 0
+        if len(candidates) <= 2:
+            return words[candidates[0]], len(candidates)
+
+        rng = np.random.default_rng()
+        pool = candidates if len(candidates) <= self.max_guesses else rng.choice(
+            candidates, self.max_guesses, replace=False
+        )
+        # 再加入一些非候选词：它们不可能是答案，但有时能排除更多可能
+        probes = rng.choice(len(words), min(len(words), self.max_guesses // 4), replace=False)
+        pool = np.unique(np.concatenate([pool, probes]))
+        guessed = set(game.guesses)
+        pool_words = [words[i] for i in pool if words[i] not in guessed] or [words[candidates[0]]]
+
+        candidate_set = set(candidates.tolist())
+        best_word, best_score = pool_words[0], -1.0
+        for word, row in zip(pool_words, self.rows(game.length, pool_words)):
+            _, counts = np.unique(row[candidates], return_counts=True)
+            probabilities = counts / len(candidates)
+            score = float(-(probabilities * np.log2(probabilities)).sum())
+            if self._bucket(game.length)[1][word] in candidate_set:
+                score += 1 / len(candidates)    # 候选词本身还有直接猜中的机会
+            if score > best_score:
+                best_word, best_score = word, score
+        return best_word, len(candidates)
+
+
+class DailyPuzzle:
+    """每日挑战中的一道题：答案和评分结果由当天所有玩家共享，每个玩家只保存自己的猜测"""
+    __slots__ = ("date", "info", "answer", "length", "max_scores", "_scores")
+
+    def __init__(self, date: str, info: AnswerInfo, max_scores: int = 4096):
+        self.date = date
+        self.info = info
+        self.answer = info.word.upper()
+        self.length = len(self.answer)
+        self.max_scores = max_scores
+        self._scores: OrderedDict[str, tuple[int, ...]] = OrderedDict()  # 猜测词 -> 反馈
+
+    def score(self, guess: str) -> tuple[int, ...]:
+        """同一个猜测词对这道题只评分一次，反馈元组也被所有玩家的棋盘共用"""
+        feedback = self._scores.get(guess)
+        if feedback is None:
+            feedback = tuple(score_guess(guess, self.answer))
+            self._scores[guess] = feedback
+            if len(self._scores) > self.max_scores:
+                self._scores.popitem(last=False)
+        else:
+            self._scores.move_to_end(guess)
+        return feedback
+
+
+class DailyPuzzles:
+    """每日挑战：每个长度每天只有一个答案，由日期和长度的哈希决定，所有群、所有玩家都相同"""
+
+    def __init__(self, word_bank: WordBank, state_file: str = None):
+        self.word_bank = word_bank
+        self.state_file = state_file    # 保存当天已完成的玩家，重启后不能重玩已知答案的题目
+        self._puzzles: dict[tuple[str, int], DailyPuzzle] = {}
+        self._finished: dict[tuple[str, int], set[str]] = {}   # 当天已经完成（猜出、用完次数或放弃）的玩家
+        self._progress: dict[tuple[str, int], dict[str, list[str]]] = {}  # 还没完成的玩家已经猜过的单词
+
+    @staticmethod
+    def today() -> str:
+        return time.strftime("%Y-%m-%d")
 
-                draw.rectangle(
-                    [x, y, x + CELL_SIZE, y + CELL_SIZE], fill=cell_color, outline=None
+    @staticmethod
+    def seed(date: str, length: int) -> int:
+        return int.from_bytes(hashlib.sha256(f"{date}:{length}".encode("ascii")).digest()[:8], "big")
+
+    def _prune(self, date: str):
+        """日期变了之后丢掉前一天的题目；进行中的旧游戏仍然持有自己的题目"""
+        for key in [key for key in self._puzzles if key[0] != date]:
+            del self._puzzles[key]
+        for key in [key for key in self._finished if key[0] != date]:
+            del self._finished[key]
+        for key in [key for key in self._progress if key[0] != date]:
+            del self._progress[key]
+
+    def adopt(self, date: str, info: AnswerInfo) -> DailyPuzzle:
+        """登记一道题（比如从会话快照中恢复的），已经存在时返回已有的对象"""
+        key = (date, len(info.word))
+        puzzle = self._puzzles.get(key)
+        if puzzle is None or puzzle.answer != info.word.upper():
+            puzzle = DailyPuzzle(date, info)
+            self._puzzles[key] = puzzle
+        return puzzle
+
+    def get(self, length: int):
+        """今天对应长度的题目，词库中没有该长度时返回None"""
+        date = self.today()
+        puzzle = self._puzzles.get((date, length))
+        if puzzle is None:
+            word = self.word_bank.pick(length, self.seed(date, length))
+            if word is None:
+                return None
+            self._prune(date)
+            puzzle = self.adopt(date, self.word_bank.answer_info(word))
+            logger.info(f"今日挑战（{date}）长度{length}的答案为{word}")
+        return puzzle
+
+    def record(self, player: str, puzzle: DailyPuzzle, guesses: list[str]):
+        """记下玩家的进度，换长度、会话过期或被淘汰后重新开始时不会重置已用的次数"""
+        self._progress.setdefault((puzzle.date, puzzle.length), {})[player] = list(guesses)
+
+    def progress(self, player: str, puzzle: DailyPuzzle) -> list[str]:
+        return self._progress.get((puzzle.date, puzzle.length), {}).get(player, [])
+
+    def finish(self, player: str, puzzle: DailyPuzzle):
+        self._finished.setdefault((puzzle.date, puzzle.length), set()).add(player)
+        self._progress.get((puzzle.date, puzzle.length), {}).pop(player, None)
+
+    def is_finished(self, player: str, puzzle: DailyPuzzle) -> bool:
+        return player in self._finished.get((puzzle.date, puzzle.length), ())
+
+    def snapshot(self) -> str:
+        """在事件循环中取出今天已完成玩家和进度的快照，写文件的工作可以交给线程池"""
+        date = self.today()
+        return json.dumps({
+            "date": date,
+            "finished": {
+                str(length): sorted(players)
+                for (finished_date, length), players in self._finished.items() if finished_date == date
+            },
+            "progress": {
+                str(length): players
+                for (progress_date, length), players in self._progress.items() if progress_date == date and players
+            },
+        }, ensure_ascii=False)
+
+    def save(self, data: str):
+        if not self.state_file:
+            return
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_file, self.state_file)
+
+    def load(self) -> int:
+        """恢复今天已完成的玩家和进度（前一天的记录直接忽略），返回恢复的已完成人次"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return 0
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("date") != self.today():
+                return 0
+            for length, players in state.get("finished", {}).items():
+                self._finished.setdefault((state["date"], int(length)), set()).update(players)
+            for length, players in state.get("progress", {}).items():
+                self._progress.setdefault((state["date"], int(length)), {}).update(
+                    (player, [str(word) for word in guesses]) for player, guesses in players.items()
                 )
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"每日挑战记录无法恢复：{e!s}")
+            return 0
+        return sum(len(players) for players in self._finished.values())
 
-                text_bbox = draw.textbbox((0, 0), letter, font=self._font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_height = text_bbox[3] - text_bbox[1]
+    def __len__(self) -> int:
+        return len(self._puzzles)
+
+
+class WordleGame:
+    __slots__ = (
+        "answer", "info", "puzzle", "image_format", "executor", "length", "max_attempts",
+        "guesses", "feedbacks", "history_letters", "history_words",
+        "_letter_max", "_guessed", "_font",
+        "_candidates", "_candidates_generation", "_filtered_rows",
+    )   # 会话可能很多，用__slots__减小每局游戏的内存占用
+
+    def __init__(
+        self, answer, image_format: str = "JPEG", font_file: str = None,
+        executor: RenderExecutor = None,
+    ):
+        # answer可以是单词、AnswerInfo，或每日挑战中共享的DailyPuzzle
+        self.puzzle = answer if isinstance(answer, DailyPuzzle) else None
+        if self.puzzle is not None:
+            answer = self.puzzle.info
+        elif not isinstance(answer, AnswerInfo):
+            answer = AnswerInfo(answer.upper())
+        self.info = answer  # 答案的释义和来源
+        self.answer = answer.word.upper()
+        self.image_format = image_format
+        self.executor = executor    # 绘制在这个线程池中进行，为None时直接在当前线程绘制
+        self.length = len(self.answer)
+        self.max_attempts = self.length + 1
+        self.guesses: list[str] = []
+        self.feedbacks: list[list[int]] = []
+        self.history_letters: list[str] = []
+        self.history_words: list[str] = []
+        self._letter_max = [0] * LETTER_SLOTS  # 每个字母在单次猜测中出现的最多次数，即历史字母表中的数量
+        self._guessed: set[str] = set()  # 猜过的单词，用于快速查重
+
+        self._font = RENDER_RESOURCES.font(font_file)  # 所有游戏共用已加载的字体
 
-                letter_x = x + (CELL_SIZE - text_width) // 2 + 2.5
-                letter_y = y + (CELL_SIZE - text_height) // 2 + 1
+        self._candidates = None # 智能提示的候选答案下标，第一次请求智能提示时创建
+        self._candidates_generation = 0
+        self._filtered_rows = 0
 
-                draw.text((letter_x, letter_y), letter, fill=TEXT_COLOR, font=self._font)
+    async def gen_image(self, rows: int = None) -> bytes:
+        # 行数在事件循环中确定，绘制期间新增的猜测不会混进这张图
+        return await run_blocking(self.executor, self.render_board, len(self.guesses) if rows is None else rows)
 
-        with BytesIO() as output:
-            image.save(output, format="PNG")
-            return output.getvalue()
+    async def gen_image_hint(self, word) -> bytes:
+        return await run_blocking(self.executor, self.render_hint, word)
+
+    def _render_key(self, kind: str, *content) -> tuple:
+        """图片缓存的键：图片内容加上影响绘制结果的参数"""
+        return (kind, self.length, self.image_format, self._font.path, self._font.size) + content
+
+    def render_board(self, rows: int = None) -> bytes:
+        """绘制前rows次猜测的棋盘：从共享的底图复制，再贴上缓存好的字母格子
+
+        不为每局游戏保留棋盘图片（5个字母约0.4MB，15个字母约3MB，会话多时内存会随之暴涨），
+        重新贴格子的耗时远小于图片编码。
+        """
+        res = RENDER_RESOURCES
+        rows = len(self.guesses) if rows is None else rows
+        guesses, feedbacks = self.guesses[:rows], self.feedbacks[:rows]
+
+        key = self._render_key(
+            "board", self.max_attempts, tuple(guesses), tuple(map(tuple, feedbacks))
+        )
+        data = IMAGE_CACHE.get(key)
+        if data is not None:
+            return data
+
+        with METRICS.timer("render_board"):
+            board = res.base_canvas(self.length, self.max_attempts).copy()
+            for row in range(rows):
+                for col in range(min(self.length, len(guesses[row]))):
+                    tile = res.tile(guesses[row][col].upper(), feedbacks[row][col], self._font)
+                    board.paste(tile, res.cell_origin(row, col))
+
+        data = encode_image(board, self.image_format)
+        IMAGE_CACHE.put(key, data)
+        return data
+
+    def render_hint(self, word) -> bytes:    # 与render_board()相似，但需要传参
+        res = RENDER_RESOURCES
+
+        key = self._render_key("hint", word)
+        data = IMAGE_CACHE.get(key)
+        if data is not None:
+            return data
+
+        with METRICS.timer("render_hint"):
+            image = res.base_canvas(self.length, 1).copy()
+
+            for col in range(self.length):
+                if word[col] == " ":
+                    continue    # 未猜出的位置保持底图上的空格子
+                image.paste(res.tile(word[col], 2, self._font), res.cell_origin(0, col))
+
+        data = encode_image(image, self.image_format)
+        IMAGE_CACHE.put(key, data)
+        return data
 
     async def is_guessed(self, word: str) -> bool:
         word = word.upper()
-        if word in self.history_words:
+        if word in self._guessed:
             logger.info(f"{word}这个单词已经猜过了。")
             return True
         else:
+            self._guessed.add(word)
             self.history_words.append(word)
             logger.info(f"is_guessed():历史猜测的单词表更新为{self.history_words}")
             return False
 
     async def guess(self, word: str) -> bytes:
+        self.record_guess(word)
+        result = await self.gen_image()
+
+        return result
+
+    def record_guess(self, word: str):
+        """记录一次猜测并打分（不绘制），调用方负责之后绘制棋盘"""
         word = word.upper()
         self.guesses.append(word)
 
-        for i in range(len(word)):
-            # 比如，历史字母表为["a","r","r","r"]（有3个r），此时用户输入refer（有2个r），历史字母表就不会再添加r了
-            # 而如果，历史字母表为["a","r"]（有1个r），此时用户输入refer（有2个r），历史字母表也会变成2个r
-            if word.count(word[i]) > self.history_letters.count(word[i]):
-                self.history_letters.append(word[i])
-
+        self._record_letters(word)
         logger.info(f"guess():历史猜测的字母表更新为{self.history_letters}。")
 
-        feedback = [0] * self.length
-        answer_char_counts: dict[str, int] = {}
-        
-        for i in range(self.length):
-            if word[i] == self.answer[i]:
-                feedback[i] = 2
-            else:
-                answer_char_counts[self.answer[i]] = answer_char_counts.get(self.answer[i], 0) + 1
-        
-        for i in range(self.length):
-            if feedback[i] != 2:
-                char = word[i]
-                if char in answer_char_counts and answer_char_counts[char] > 0:
-                    feedback[i] = 1
-                    answer_char_counts[char] -= 1
-        
-        self.feedbacks.append(feedback)
-        result = await self.gen_image()
-
-        return result
+        if self.puzzle is not None:
+            self.feedbacks.append(self.puzzle.score(word))
+        else:
+            self.feedbacks.append(score_guess(word, self.answer))
     
+    def _record_letters(self, word: str):
+        # 比如，历史字母表为["a","r","r","r"]（有3个r），此时用户输入refer（有2个r），历史字母表就不会再添加r了
+        # 而如果，历史字母表为["a","r"]（有1个r），此时用户输入refer（有2个r），历史字母表也会变成2个r
+        counts = letter_counts(word)
+        for char in word:
+            code = letter_index(char)
+            if counts[code] > self._letter_max[code]:
+                self._letter_max[code] += 1
+                self.history_letters.append(char)
+
     async def hint(self) -> bytes:   # 原理和guess()相同，但本函数无需传参
-        tem = 0
-        for i in range(len(self.answer)):
-            if self.answer[i] in self.history_letters:
-                tem += 1
-        if not tem >= 1:
-            logger.info("用户还未猜出任何字母。")
+        hint_word = self.hint_word()
+        if hint_word is None:
             return False
 
-        else:
-            # 组建“提示”的单词，未猜出的字母用空格代替
-            hint_word = ""
-            tem1 = self.history_letters.copy()  # 这里使用copy()是因为：在 Python 中，当你执行 tem1 = self.history_letters 时，tem1 并没有创建一个新的独立对象，而是指向了与 self.history_letters 相同的对象（即它们共享同一块内存地址）。此时，如果 self.history_letters 是可变对象（如列表、字典、集合等），修改 tem1 的内容会导致 self.history_letters 同步变化，因为二者本质上是同一个对象的不同引用。
-            for i in range(len(self.answer)):
-                if self.answer[i] in tem1:
-                    hint_word = hint_word + self.answer[i]
-                    tem1.remove(self.answer[i])  # 举个例子，这是为了避免出现这样一种情况：历史字母表只有一个“r”字母，但提示的单词却给出了更多“r”
-                else:
-                    hint_word = hint_word + " "
-            hint_word = hint_word.upper()
-            
-            # 将组建的“提示”单词生成图片
-            result = await self.gen_image_hint(hint_word)
+        # 将组建的“提示”单词生成图片
+        result = await self.gen_image_hint(hint_word)
+
+        return result
+
+    def hint_word(self):
+        """组建“提示”的单词，未猜出的字母用空格代替；一个字母都没猜出时返回None"""
+        if not any(self._letter_max[letter_index(char)] for char in self.answer):
+            logger.info("用户还未猜出任何字母。")
+            return None
 
-            return result
+        hint_word = ""
+        remaining = self._letter_max.copy()   # 每揭示一个字母就用掉一个，避免历史字母表只有一个“r”，提示中却给出了更多“r”
+        for char in self.answer:
+            code = letter_index(char)
+            if remaining[code] > 0:
+                hint_word = hint_word + char
+                remaining[code] -= 1
+            else:
+                hint_word = hint_word + " "
+        return hint_word
     
+    def to_dict(self) -> dict:
+        """游戏状态的可序列化形式，用于持久化"""
+        return {
+            "answer": self.answer,
+            "info": list(self.info),
+            "guesses": self.guesses,
+            "feedbacks": self.feedbacks,
+            "history_letters": self.history_letters,
+            "history_words": self.history_words,
+            "daily": self.puzzle.date if self.puzzle is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, *args, puzzles: DailyPuzzles = None, **kwargs) -> "WordleGame":
+        info = AnswerInfo(*data["info"]) if data.get("info") else AnswerInfo(data["answer"])
+        if data.get("daily") and puzzles is not None:
+            info = puzzles.adopt(data["daily"], info)  # 每日挑战的游戏重新共用同一道题
+        game = cls(info, *args, **kwargs)
+        game.guesses = list(data.get("guesses", []))
+        if game.puzzle is not None:
+            game.feedbacks = [game.puzzle.score(word) for word in game.guesses]
+        else:
+            game.feedbacks = [list(feedback) for feedback in data.get("feedbacks", [])]
+        game.history_words = list(data.get("history_words", []))
+        game._guessed = set(game.history_words)
+        for word in game.guesses:
+            game._record_letters(word)
+        return game
+
     @property
     def is_game_over(self):
         if not self.guesses:
@@ -221,6 +1426,185 @@ class WordleGame:
         return self.guesses and self.guesses[-1].upper() == self.answer
 
 
+INTENT_START = "start"
+INTENT_HINT = "hint"
+INTENT_END = "end"
+INTENT_GUESS = "guess"
+INTENT_STATUS = "status"
+
+# 所有指令都包含“猜单词”，一次正则搜索就能分辨意图；“/猜单词”后面紧跟结束、提示等字样时不算开始游戏
+_COMMAND_RE = re.compile(
+    r"(?P<end>猜单词结束|结束猜单词|退出猜单词|猜单词退出)"
+    r"|(?P<hint>猜单词提示|提示猜单词)"
+    r"|(?P<status>/猜单词状态)"
+    r"|(?P<start>/猜单词(?!结束|退出|提示|状态))"
+)
+
+
+def route_message(msg: str):
+    """判断消息的意图：开始、提示、结束或者猜测；含有“猜单词”却不是指令时返回None"""
+    if "猜单词" not in msg:
+        return INTENT_GUESS
+    match = _COMMAND_RE.search(msg)
+    if match is None:
+        return None
+    if match.lastgroup == "start" and ("提示" in msg or "结束" in msg):
+        return None
+    return match.lastgroup
+
+
+class SessionManager:
+    """游戏会话管理：空闲超时淘汰、数量上限（超出时淘汰最久未活动的会话）以及可选的持久化
+
+    用法与dict相同；访问会话会刷新它的活动时间。
+    """
+
+    def __init__(self, ttl: float = 3600, max_sessions: int = 1000, snapshot_file: str = None):
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.snapshot_file = snapshot_file
+        self._sessions: OrderedDict[str, WordleGame] = OrderedDict()   # 按最近活动时间排序
+        self._last_active: dict[str, float] = {}
+        self._locks = weakref.WeakValueDictionary()  # 没有协程持有或等待时自动释放
+        self.evicted = 0
+        self.expired = 0
+
+    def _is_expired(self, session_id: str, now: float = None) -> bool:
+        return self.ttl > 0 and (now or time.time()) - self._last_active[session_id] > self.ttl
+
+    def _touch(self, session_id: str):
+        self._sessions.move_to_end(session_id)
+        self._last_active[session_id] = time.time()
+
+    def __contains__(self, session_id: str) -> bool:
+        if session_id not in self._sessions:
+            return False
+        if self._is_expired(session_id):
+            self._remove(session_id)
+            self.expired += 1
+            return False
+        return True
+
+    def __getitem__(self, session_id: str) -> WordleGame:
+        if session_id not in self:
+            raise KeyError(session_id)
+        self._touch(session_id)
+        return self._sessions[session_id]
+
+    def __setitem__(self, session_id: str, game: WordleGame):
+        self._sessions[session_id] = game
+        self._touch(session_id)
+        while len(self._sessions) > self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self._remove(oldest)
+            self.evicted += 1
+            logger.info(f"会话数量超过上限{self.max_sessions}，已淘汰最久未活动的会话{oldest}。")
+
+    def __delitem__(self, session_id: str):
+        self._remove(session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _remove(self, session_id: str):
+        del self._sessions[session_id]
+        del self._last_active[session_id]
+
+    def get(self, session_id: str, default=None):
+        return self[session_id] if session_id in self else default
+
+    def pop(self, session_id: str, default=None):
+        game = self.get(session_id, default)
+        if session_id in self._sessions:
+            self._remove(session_id)
+        return game
+
+    def lock(self, session_id: str, kind: str = "state") -> asyncio.Lock:
+        """会话的异步锁：同一会话的操作依次进行，不同会话互不影响
+
+        state锁保护猜测的校验和记录，render锁让同一会话的棋盘依次绘制。
+        """
+        key = (session_id, kind)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[key] = lock
+        return lock
+
+    def sweep(self) -> int:
+        """清理所有超时的会话，返回清理的数量"""
+        now = time.time()
+        expired = [session_id for session_id in self._sessions if self._is_expired(session_id, now)]
+        for session_id in expired:
+            self._remove(session_id)
+        self.expired += len(expired)
+        if expired:
+            logger.info(f"已清理{len(expired)}个超时的猜单词会话。")
+        return len(expired)
+
+    def snapshot(self) -> list[str]:
+        """在事件循环中取出所有会话的快照（JSON行），写文件的工作可以交给线程池"""
+        return [
+            json.dumps({
+                "session_id": session_id,
+                "last_active": self._last_active[session_id],
+                "game": game.to_dict(),
+            }, ensure_ascii=False)
+            for session_id, game in self._sessions.items()
+        ]
+
+    def save(self, lines: list[str]):
+        if not self.snapshot_file:
+            return
+        tmp_file = f"{self.snapshot_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line + "\n")
+        os.replace(tmp_file, self.snapshot_file)
+
+    def load(self, game_factory) -> int:
+        """从快照恢复会话，game_factory把字典还原成WordleGame"""
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return 0
+        restored = []
+        with open(self.snapshot_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    restored.append((record["last_active"], record["session_id"], game_factory(record["game"])))
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"跳过一条无法恢复的会话快照：{e!s}")
+        for last_active, session_id, game in sorted(restored, key=lambda item: item[0]):
+            self._sessions[session_id] = game
+            self._last_active[session_id] = last_active
+        self.sweep()
+        while len(self._sessions) > self.max_sessions:
+            self._remove(next(iter(self._sessions)))
+        return len(self._sessions)
+
+
+class RateLimiter:
+    """令牌桶限流：每个键每分钟补充rate个令牌，最多攒下burst个；rate为0时不限制"""
+
+    def __init__(self, rate_per_minute: float, burst: int = 5, max_keys: int = 10000):
+        self.rate = rate_per_minute / 60
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()   # 键 -> (剩余令牌, 上次更新时间)
+
+    def allow(self, key: str) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1
+        self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)   # 最久没有活动的桶早已攒满，丢掉也没有影响
+        return allowed
+
+
 @register(
     "astrbot_plugin_wordle_2_msg",
     "Raven95676, whzc",
@@ -231,46 +1615,193 @@ class WordleGame:
 
 class PluginWordle(Star):
     def __init__(self, context: Context, config: dict):
+        start = time.perf_counter()
         super().__init__(context)
-        self.game_sessions: dict[str, WordleGame] = {}
         # 加载配置文件
         self.config = config
         
         # 自定义拼写检查
-        self.custom_word_list = self.config.get("custom_word_list", "").split(";")
+        self.custom_words = CustomWordMatcher(self.config.get("custom_word_list", ""))
+
+        # 词库（首次使用时加载编译好的索引，词表有变化时自动重建）
+        self.word_bank = WordBank(
+            os.path.join(PLUGIN_DIR, "wordlist"),
+            os.path.join(PLUGIN_DIR, "wordbank.idx"),
+        )
+        self.validator = WordValidator(self.word_bank, self.custom_words)
+
+        # 每日挑战：每个长度每天一个答案，所有群共用；每个玩家在群里各自猜
+        self.daily_mode = bool(self.config.get("daily_mode", False))
+        self.daily = DailyPuzzles(
+            self.word_bank,
+            state_file=os.path.join(PLUGIN_DIR, "daily.json") if self.config.get("session_persist", False) else None,
+        )
+        self.daily.load()
+
+        # 已编码图片的缓存上限
+        IMAGE_CACHE.max_bytes = int(float(self.config.get("image_cache_mb", 16)) * 1024 * 1024)
+
+        # 性能统计导出文件（留空则不导出）
+        self.metrics_export_path = self.config.get("metrics_export_path", "")
+
+        # 提示模式：letters为揭示已猜出的字母，smart为推荐能带来最多信息的下一个猜测
+        self.hint_mode = self.config.get("hint_mode", "letters")
+        self.solver = HintSolver(
+            self.word_bank, max_bytes=int(float(self.config.get("hint_cache_mb", 64)) * 1024 * 1024)
+        )
+        if self.hint_mode == "smart" and not HintSolver.available():
+            logger.warning("智能提示需要安装numpy，将使用普通提示。")
+
+        # 图片输出：编码格式，以及直接发送字节还是写入临时文件
+        self.image_format = IMAGE_FORMATS.get(str(self.config.get("image_format", "jpg")).lower(), "JPEG")
+        self.image_delivery = self.config.get("image_delivery", "bytes")
+        self.tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()  # 优先使用内存文件系统
+
+        # 自定义字体（留空使用默认字体，相对路径以插件目录为准）
+        self.font_file = self.config.get("font_file", "") or None
+
+        # 绘制线程池，避免大棋盘的绘制阻塞事件循环
+        self.executor = RenderExecutor(
+            int(self.config.get("render_workers", 2)),
+            int(self.config.get("render_queue_size", 16)),
+        )
+
+        # 猜测限流：每位玩家、每个会话每分钟最多猜多少次（0为不限制）
+        burst = int(self.config.get("guess_burst", 5))
+        self.user_limiter = RateLimiter(float(self.config.get("guess_rate_per_user", 20)), burst)
+        self.session_limiter = RateLimiter(float(self.config.get("guess_rate_per_session", 60)), burst)
+
+        # 游戏会话：空闲超时、数量上限、定期清理，可选在重启后恢复
+        self.game_sessions = SessionManager(
+            ttl=float(self.config.get("session_ttl_minutes", 60)) * 60,
+            max_sessions=int(self.config.get("max_sessions", 1000)),
+            snapshot_file=os.path.join(PLUGIN_DIR, "sessions.jsonl") if self.config.get("session_persist", False) else None,
+        )
+        restored = self.game_sessions.load(self.restore_game)
+        if restored:
+            logger.info(f"已恢复{restored}局未结束的猜单词游戏。")
+        self._sweeper = None
+        self._warmup = None
+        try:
+            self.ensure_background_tasks()
+        except RuntimeError:
+            pass    # 没有运行中的事件循环，等收到第一条消息时再启动
+
+        logger.info(f"猜单词插件加载完成，耗时{(time.perf_counter() - start) * 1000:.1f}毫秒")
+
+    def restore_game(self, data: dict) -> WordleGame:
+        return WordleGame.from_dict(data, self.image_format, self.font_file, self.executor, puzzles=self.daily)
 
     @staticmethod
-    async def get_answer(length):
+    def player_key(event: AstrMessageEvent) -> str:
+        """同一平台上的同一个玩家，不区分群聊和私聊"""
+        platform = event.unified_msg_origin.split(":", 1)[0]
+        return f"{platform}#{event.get_sender_id()}"
+
+    def session_key(self, event: AstrMessageEvent) -> str:
+        """普通模式下一个群（私聊）一局游戏；每日挑战模式下每个玩家只有一局，在哪个群里都能接着猜"""
+        if self.daily_mode:
+            return self.player_key(event)
+        return event.unified_msg_origin
+
+    def ensure_background_tasks(self):
+        """在事件循环中启动后台任务（只启动一次）：预热词库和拼写检查库、定期清理会话并检查词表是否有更新"""
+        if self._warmup is None:
+            self._warmup = asyncio.get_running_loop().create_task(self._warm_up())
+        if self._sweeper is None:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_sessions())
+
+    async def _warm_up(self):
         try:
-            wordlist_path = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)), "wordlist"
-            )
-
-            if not os.path.exists(wordlist_path):
+            await self.ensure_word_bank()
+            await self.executor.run(self.validator.load_spellchecker)
+        except Exception as e:
+            logger.error(f"猜单词后台加载失败: {e!s}")
+
+    async def _sweep_sessions(self, interval: float = 60):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.executor.run(self.word_bank.reload_if_changed):
+                    self.validator.clear_cache()    # 单词可能有增删，之前的拼写检查结论不再可靠
+                self.game_sessions.sweep()
+                if self.game_sessions.snapshot_file:
+                    await self.executor.run(self.game_sessions.save, self.game_sessions.snapshot())
+                if self.daily.state_file:
+                    await self.executor.run(self.daily.save, self.daily.snapshot())
+                if self.metrics_export_path:
+                    await self.executor.run(self.export_metrics)
+            except Exception as e:
+                logger.error(f"猜单词定期维护失败: {e!s}")
+
+    async def terminate(self):
+        for task in (self._warmup, self._sweeper):
+            if task is not None:
+                task.cancel()
+        try:
+            self.game_sessions.save(self.game_sessions.snapshot())
+            self.daily.save(self.daily.snapshot())
+        except OSError as e:
+            logger.error(f"保存猜单词会话失败: {e!s}")
+        self.executor.shutdown()
+
+    async def image_component(self, data: bytes):
+        """把编码好的图片包装成消息组件，返回(组件, 需要在发送后删除的临时文件)"""
+        with METRICS.timer("deliver"):
+            if self.image_delivery != "file":
+                return Image.fromBytes(data), None
+            tmp_file = await self.executor.run(self._write_tmp_file, data)
+            return Image.fromFileSystem(tmp_file), tmp_file
+
+    def _write_tmp_file(self, data: bytes) -> str:
+        fd, tmp_file = tempfile.mkstemp(
+            suffix=".jpg" if self.image_format == "JPEG" else ".png",
+            prefix="wordle_",
+            dir=self.tmp_dir,
+        )   # 文件名唯一，并发的会话不会互相覆盖
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return tmp_file
+
+    async def remove_tmp_file(self, tmp_file: str):
+        try:
+            await self.executor.run(os.remove, tmp_file)
+        except RenderBusyError:
+            os.remove(tmp_file)
+
+    async def ensure_word_bank(self):
+        """词库第一次加载（可能需要编译索引）放到线程池中进行"""
+        if not self.word_bank.loaded:
+            await self.executor.run(self.word_bank.ensure_loaded)
+
+    def refresh_custom_words(self):
+        """配置中的自定义单词变化后重新编译"""
+        raw = self.config.get("custom_word_list", "")
+        if raw != self.custom_words.raw:
+            self.custom_words = CustomWordMatcher(raw)
+            self.validator.set_custom_words(self.custom_words)
+            logger.info("自定义单词已更新。")
+
+    async def get_answer(self, length):
+        with METRICS.timer("get_answer"):
+            return self._get_answer(length)
+
+    def _get_answer(self, length):
+        try:
+            if not os.path.exists(self.word_bank.wordlist_path):
                 logger.error("词表文件不存在")
                 return None
 
-            # 获取单词文件
-            word_file_list = os.listdir(wordlist_path)
-            global word_dict
-            word_dict = {}
-            # 遍历单词表，并用字典接收内容
-            for word_file in word_file_list:
-                with open(os.path.join(wordlist_path,word_file),"r",encoding="utf-8") as f:
-                    word_dict.update(json.load(f)) 
-                    # 只保留长度为length的单词
-                    for word in list(word_dict.keys()):
-                        if len(word) != length:
-                            del word_dict[word]
-
             # 随机选一个单词
-            word = random.choice(list(word_dict.keys()))
-            global explanation
-            explanation = word_dict[word]["中释"]
+            word = self.word_bank.pick(length)
+            if word is None:
+                logger.info(f"词库中没有长度为{length}的单词")
+                return None
 
-            logger.info(f"选择了{word}单词，长度{length}，释义为{explanation}")
+            answer = self.word_bank.answer_info(word)
+            logger.info(f"选择了{word}单词，长度{length}，释义为{answer.zh}，来自{answer.source}")
 
-            return word.upper()
+            return answer
         
         except Exception as e:
             logger.error(f"加载词表失败: {e!s}")
@@ -279,227 +1810,394 @@ class PluginWordle(Star):
     @event_message_type(EventMessageType.ALL)
     async def on_message(self, event: AstrMessageEvent):
         msg = event.get_message_str()
+        session_id = self.session_key(event)
+
+        # 快速路径：绝大多数消息既不含“猜单词”，所在会话也没有进行中的游戏，直接忽略
+        if "猜单词" not in msg and session_id not in self.game_sessions:
+            return
+
+        self.ensure_background_tasks()
         msg = msg.lower()
+        intent = route_message(msg)
+        if intent is None:
+            return
+
+        handler = {
+            INTENT_END: self.end_game,
+            INTENT_HINT: self.give_hint,
+            INTENT_START: self.start_game,
+            INTENT_GUESS: self.handle_guess,
+            INTENT_STATUS: self.show_status,
+        }[intent]
+
+        # 只统计插件自己的处理时间，不包括消息发送（yield之后）的时间
+        elapsed = 0.0
+        start = time.perf_counter()
+        async for result in handler(event, msg):
+            elapsed += time.perf_counter() - start
+            yield result
+            start = time.perf_counter()
+        METRICS.observe(f"on_message.{intent}", elapsed + time.perf_counter() - start)
+
+    def status_gauges(self) -> dict:
+        word_bank = self.word_bank.stats()
+        cache = self.validator.cache_info()
+        executor = self.executor.stats()
+        return {
+            "active_sessions": len(self.game_sessions),
+            "daily_puzzles": len(self.daily),
+            "sessions_evicted": self.game_sessions.evicted,
+            "sessions_expired": self.game_sessions.expired,
+            "wordbank_words": word_bank["words"],
+            "wordbank_index_bytes": word_bank["index_bytes"],
+            "validator_cache_hits": cache.hits,
+            "validator_cache_misses": cache.misses,
+            "render_in_flight": executor["in_flight"],
+            "render_queue_depth": executor["queue_depth"],
+            "render_peak_queue_depth": executor["peak_queue_depth"],
+            "render_rejected": executor["rejected"],
+            "image_cache_hits": IMAGE_CACHE.hits,
+            "image_cache_misses": IMAGE_CACHE.misses,
+            "image_cache_bytes": IMAGE_CACHE.size,
+        }
 
-        if "猜单词结束" in msg or "结束猜单词" in msg or "退出猜单词" in msg or "猜单词退出" in msg:
-            """中止Wordle游戏"""
-            session_id = event.unified_msg_origin
-            if session_id not in self.game_sessions:
-                yield event.plain_result("游戏还没开始，输入“/猜单词”来开始游戏吧！")
+    def export_metrics(self):
+        """把统计数据写入配置的文件：.prom/.txt结尾为Prometheus文本格式，否则为JSON"""
+        path = self.metrics_export_path
+        if not path:
+            return
+        gauges = self.status_gauges()
+        if path.endswith((".prom", ".txt")):
+            content = METRICS.to_prometheus(gauges)
+        else:
+            content = json.dumps({
+                "time": time.time(),
+                "gauges": gauges,
+                "stages": METRICS.snapshot(),
+                "counters": METRICS.counters,
+            }, ensure_ascii=False, indent=2)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_file, path)
+
+    async def show_status(self, event: AstrMessageEvent, msg: str):
+        """查看插件的运行状态（仅管理员）"""
+        if not event.is_admin():
+            yield event.plain_result("只有管理员可以查看猜单词状态。")
+            return
+
+        def hit_rate(hits: int, misses: int) -> str:
+            return f"{hits / (hits + misses):.1%}" if hits + misses else "-"
+
+        gauges = self.status_gauges()
+        lines = [
+            f"进行中的游戏：{gauges['active_sessions']}（超时清理{gauges['sessions_expired']}，超量淘汰{gauges['sessions_evicted']}）"
+            + (f"，每日挑战题目{gauges['daily_puzzles']}道" if self.daily_mode else ""),
+            f"词库：{gauges['wordbank_words']}个单词，索引{gauges['wordbank_index_bytes'] / 1024 / 1024:.1f}MB（mmap）",
+            f"拼写检查缓存命中率：{hit_rate(gauges['validator_cache_hits'], gauges['validator_cache_misses'])}，"
+            f"拼写检查库：{'已加载' if self.validator.spellchecker_ready else '未加载'}",
+            f"字母格子缓存命中率：{hit_rate(METRICS.counters.get('tile_cache.hit', 0), METRICS.counters.get('tile_cache.miss', 0))}",
+            f"图片缓存命中率：{hit_rate(gauges['image_cache_hits'], gauges['image_cache_misses'])}，"
+            f"{len(IMAGE_CACHE)}张，{gauges['image_cache_bytes'] / 1024 / 1024:.1f}/{IMAGE_CACHE.max_bytes / 1024 / 1024:.0f}MB",
+            f"绘制线程：{gauges['render_in_flight']}/{self.executor.max_workers}，"
+            f"排队{gauges['render_queue_depth']}（峰值{gauges['render_peak_queue_depth']}），拒绝{gauges['render_rejected']}",
+            f"猜测限流{METRICS.counters.get('guess_rate_limited', 0)}次，合并绘制{METRICS.counters.get('render_coalesced', 0)}次",
+            "各阶段耗时（p50/p99，毫秒）：",
+        ]
+        for stage, stats in sorted(METRICS.snapshot().items()):
+            lines.append(f"  {stage}：{stats['p50_ms']}/{stats['p99_ms']}（{stats['count']}次）")
+        yield event.plain_result("\n".join(lines))
+
+    async def end_game(self, event: AstrMessageEvent, msg: str):
+        """中止Wordle游戏"""
+        session_id = self.session_key(event)
+        # 先在锁内移除会话再发送消息，发送期间的猜测或新游戏不会与结束操作交错
+        async with self.game_sessions.lock(session_id):
+            game = self.game_sessions.pop(session_id)
+            if game is not None and game.puzzle is not None:
+                self.daily.finish(session_id, game.puzzle)
+        if game is None:
+            yield event.plain_result("游戏还没开始，输入“/猜单词”来开始游戏吧！")
+        elif game.puzzle is not None:
+            yield event.plain_result("今天的挑战已放弃，答案就不公布啦，明天再来吧！")   # 其他人还在猜同一个答案
+        else:
+            yield event.plain_result(f"猜单词已结束，正确答案是{game.answer}。")
+
+    async def give_hint(self, event: AstrMessageEvent, msg: str):
+        session_id = self.session_key(event)
+        async with self.game_sessions.lock(session_id):
+            game = self.game_sessions.get(session_id)
+            hint_word = game.hint_word() if game is not None else None    # 在锁内取得一致的提示内容
+        if game is None:
+            yield event.plain_result("游戏还没开始，输入“/猜单词”来开始游戏吧！")
+            return
+
+        if self.hint_mode == "smart" and HintSolver.available():
+            try:
+                word, remaining = await self.executor.run(self.solver.suggest, game)
+            except RenderBusyError:
+                yield event.plain_result("现在猜单词的人太多了，请稍后再试。")
                 return
-            if session_id in self.game_sessions:
-                game = self.game_sessions[session_id]
-                yield event.plain_result(f"猜单词已结束，正确答案是{game.answer}。")
-                del self.game_sessions[session_id]
-
-        if "猜单词提示" in msg or "提示猜单词" in msg:
-            session_id = event.unified_msg_origin
-            if session_id not in self.game_sessions:
-                yield event.plain_result("游戏还没开始，输入“/猜单词”来开始游戏吧！")
+            if word is not None:
+                if remaining <= 1:
+                    yield event.plain_result(f"只剩一种可能了，试试“{word}”吧！")
+                else:
+                    yield event.plain_result(f"还有{remaining}个可能的答案，试试猜“{word}”，能排除最多的可能！")
                 return
-            game = self.game_sessions[session_id]
+            # 词库中找不到与反馈相符的答案（比如词表被修改过），改用普通提示
 
-            image_result_hint = await game.hint()
-
-            if not image_result_hint == False:  # 当用户猜出来过正确的字母时，给出图片形式的提示
-                
-                # 保证兼容性（从原作者那偷的），将png转为jpg
-                tem_id = session_id.replace(":","") # 删掉文件系统不兼容的符号
-                img_path_png = os.path.join(
-                    os.path.dirname(os.path.abspath(__file__)),
-                    f"{tem_id}_{len(game.guesses)}_wordle_hint.png",
-                )
-                img_path_jpg = os.path.join(
-                    os.path.dirname(os.path.abspath(__file__)),
-                    f"{tem_id}_{len(game.guesses)}_wordle_hint.jpg",
-                )
-
-                with open(img_path_png, "wb") as f:
-                    f.write(image_result_hint)
+        try:
+            image_result_hint = await game.gen_image_hint(hint_word) if hint_word is not None else False
+            if image_result_hint:
+                image, tmp_file = await self.image_component(image_result_hint)
+        except RenderBusyError:
+            yield event.plain_result("现在猜单词的人太多了，请稍后再试。")
+            return
 
-                im = ImageW.open(img_path_png)
-                im = im.convert('RGB')
-                im.save(img_path_jpg, quality=95)
+        if not image_result_hint == False:  # 当用户猜出来过正确的字母时，给出图片形式的提示
 
-                chain = [
-                    Image.fromFileSystem(img_path_jpg),
-                    Plain("这是你已经猜出的字母。")
-                ]
+            chain = [
+                image,
+                Plain("这是你已经猜出的字母。")
+            ]
+            try:
                 yield event.chain_result(chain)
-
-                os.remove(img_path_png)
-                os.remove(img_path_jpg)
-
-            else:   # 当用户一个字母都没有猜出来过时，给出文本形式的提示
-                i = random.randint(0,len(game.answer)-1)
-                hint = f"提示：第{i+1}个字母是 {game.answer[i]}。"
-                yield event.plain_result(hint)
-    
-        if "/猜单词" in msg and not "提示" in msg and not "结束" in msg:
-            length = msg.strip("/猜单词 ")
-            logger.info(length)
-            if length == "":
-                length = 5
-                user_length_ok = True   # 比如：用户输入了/猜单词
-            else:
-                try:
-                    length = int(length)
-                    if length >= 1:
-                        user_length_ok = True   # 比如：用户输入了/猜单词 2
-                    else:
-                        user_length_ok = False  # 比如：用户输入了/猜单词 -3
-                        length = 5
-                except:
+            finally:
+                if tmp_file:
+                    await self.remove_tmp_file(tmp_file)
+
+        else:   # 当用户一个字母都没有猜出来过时，给出文本形式的提示
+            i = random.randint(0,len(game.answer)-1)
+            hint = f"提示：第{i+1}个字母是 {game.answer[i]}。"
+            yield event.plain_result(hint)
+
+    async def start_game(self, event: AstrMessageEvent, msg: str):
+        """开始Wordle游戏"""
+        length = msg.strip("/猜单词 ")
+        logger.info(length)
+        if length == "":
+            length = 5
+            user_length_ok = True   # 比如：用户输入了/猜单词
+        else:
+            try:
+                length = int(length)
+                if length >= 1:
+                    user_length_ok = True   # 比如：用户输入了/猜单词 2
+                else:
+                    user_length_ok = False  # 比如：用户输入了/猜单词 -3
                     length = 5
-                    user_length_ok = False  # 比如：用户输入了/猜单词 @#&$*@
+            except:
+                length = 5
+                user_length_ok = False  # 比如：用户输入了/猜单词 @#&$*@
 
-            """开始Wordle游戏"""
+        try:
+            await self.ensure_word_bank()
+        except RenderBusyError:
+            yield event.plain_result("现在猜单词的人太多了，请稍后再试。")
+            return
+        session_id = self.session_key(event)
+        if os.path.exists(self.word_bank.wordlist_path) and not self.word_bank.has_length(length):
+            answer = None   # 词库中没有这个长度，不必再抽取
+        elif self.daily_mode:
+            answer = self.daily.get(length)
+        else:
             answer = await self.get_answer(length)
-            session_id = event.unified_msg_origin
-            if session_id in self.game_sessions:
-                del self.game_sessions[session_id]
-            if not answer:
-                random_text = random.choice([
-                    f"{length}个字母长度的单词，我找不到啊……",
-                    f"{length}个字母的单词好像有点稀有哦，换一个吧！",
-                    "没找到这么长的单词，换一个吧！"
-                ])
-                yield event.plain_result(random_text)
-            else:
-                game = WordleGame(answer)
-                self.game_sessions[session_id] = game
-                logger.debug(f"答案是：{answer}")
-                if user_length_ok:
-                    random_text = random.choice([
-                            f"游戏开始！请输入长度为{length}的单词。",
-                            f"游戏开始了！请输入长度为{length}的单词。",
-                            f"游戏开始了！请输入长度为{length}的单词。"
-                        ])
-                elif not user_length_ok:
-                    random_text = random.choice([
-                            f"不清楚你想猜多长的单词，那就{length}个字母的吧！",
-                            f"你想猜多长的单词？长度{length}如何？游戏开始！",
-                            f"不明白你的意思，但是，游戏开始！请输入长度为{length}的单词。",
-                            f"单词长度{length}如何？游戏开始，请输入！",
-                        ])
-                yield event.plain_result(random_text)
-            pass
-
-        session_id = event.unified_msg_origin
-        if session_id in self.game_sessions and event.is_at_or_wake_command:
-            game = self.game_sessions[session_id]
-
-            if "猜单词" in msg or "猜单词结束" in msg or "猜单词提示" in msg:
-                return
-            
-            else:
 
-                length = game.length
-                spellcheck = SpellChecker()
-
-                if not msg.isalpha():
-                    random_text = random.choice([
-                    "你要输入英语才行啊😉！",
-                    "语言不正确哦，要输入英语单词。",
-                    "我以后就可以用其他语言猜单词了，不过现在还是用英语吧！",
-                    "Try in English💬!", 
-                    "需要英文单词～🔡",  
-                    "Alphabet Only!🔤", 
-                    "外星挑战：地球英文输入🛸。", 
-                    "符号错误🔣，需要纯字母。", 
-                    "❗Error: Expected ENGLISH :("
-                ])
-                    random_text = random_text + "\n输入“猜单词结束”就可以结束游戏，输入“猜单词提示”可以获得提示。"
-                    yield event.plain_result(random_text)
-                    return
-                
-                elif len(msg) != length:
-                    random_text = random.choice([
-                    f"你要输入{length}字母的英语单词才行啊😉！",
-                    f"不太对哦，要输入{length}个字母的英语单词🔡。",
-                    f"Traceback (most recent call last):\n  File \"\<wordle\>\", line 114, in \<module\>\nSpellError: I need {length}-letter English words! :(",
-                    f"需要{length}个字母长的英语单词～🔡", 
-                    f"输入有问题！请输入{length}个字母长的英语单词。",
-                    f"回答错误❌！应该是有{length}个字母的英语单词。",
-                    f"戳啦🌀！请输入{length}个字母的英语单词。"
-
-                ])
-                    random_text = random_text + "\n输入“猜单词结束”就可以结束游戏，输入“猜单词提示”可以获得提示。"
-                    yield event.plain_result(random_text)
-                    return   
-                    
-                elif not(
-                    msg in list(word_dict.keys())   # 在词表中是否找到用户的输入
-                    or spellcheck.known((msg,)) # 在拼写检查库中是否找到用户的输入
-                    or (re_spell_check(msg,self.custom_word_list))
-                    ):
-                    random_text = random.choice([
-                    "拼写错误😉！",
-                    "拼错了哦，试试重新拼一下单词吧！",
-                    "单词拼写不正确！",
-                    "拼写有误🌀，再试一次吧！",
-                    "（你确定这个单词存在吗😲？）",
-                    "拼写错误，请检查拼写！",
-                    ])
-                    random_text = random_text + "\n输入“猜单词结束”就可以结束游戏，输入“猜单词提示”可以获得提示。"
-                    yield event.plain_result(random_text)
-                    return
-            
-            if not await game.is_guessed(msg):
-                image_result = await game.guess(msg)
+        # 替换会话在锁内完成，不会与同一会话中的猜测、结束操作交错；消息在锁外发送
+        reply = None
+        async with self.game_sessions.lock(session_id):
+            current = self.game_sessions.get(session_id)
+            if self.daily_mode and answer is not None and self.daily.is_finished(session_id, answer):
+                reply = f"今天{length}个字母的挑战你已经完成了，明天再来吧！"
+            elif self.daily_mode and current is not None and current.puzzle is answer:
+                reply = f"你今天{length}个字母的挑战还没结束，已猜测 {len(current.guesses)}/{current.max_attempts} 次，请继续输入单词。"
             else:
-                yield event.plain_result("这个单词已经猜过了！")
-                return
-
-            if game.is_won:
-                sender_info = event.get_sender_name() if event.get_sender_name() else event.get_sender_id()
+                self.game_sessions.pop(session_id)
+                if answer:
+                    game = WordleGame(answer, self.image_format, self.font_file, self.executor)
+                    # 每日挑战接着之前的进度，换长度、会话过期或被淘汰都不会重置已用的次数
+                    for word in self.daily.progress(session_id, answer) if self.daily_mode else ():
+                        await game.is_guessed(word)
+                        game.record_guess(word)
+                    self.game_sessions[session_id] = game
+        if reply is not None:
+            yield event.plain_result(reply)
+            return
+
+        if not answer:
+            random_text = random.choice([
+                f"{length}个字母长度的单词，我找不到啊……",
+                f"{length}个字母的单词好像有点稀有哦，换一个吧！",
+                "没找到这么长的单词，换一个吧！"
+            ])
+            yield event.plain_result(random_text)
+        else:
+            logger.debug(f"答案是：{game.answer}")
+            if self.daily_mode and game.guesses:
+                random_text = f"继续今天{length}个字母的挑战，已猜测 {len(game.guesses)}/{game.max_attempts} 次，请继续输入单词。"
+            elif self.daily_mode:
+                random_text = f"今日挑战开始！今天所有人的{length}字母单词都是同一个，请输入长度为{length}的单词。"
+            elif user_length_ok:
                 random_text = random.choice([
-                    "恭喜你猜对了😉！",
-                    "Cool🎉！",
-                    "答案正确✅！"
-                    "太棒了🎉！", 
-                    "猜中啦🎯！",  
-                    "冠军🥇！", 
-                    "天才🌟！", 
-                    "胜利🏆！", 
-                    "满分💯！", 
-                    "王者👑！", 
-                    "绝了🤩！"
-                ])
-                if random.randint(1,22) == 1:
-                    random_text = "🔠🥳语言神，启动🔠🥳！"
-                game_status = f"{random_text}“{game.answer}”的意思是“{explanation}”。"
-                del self.game_sessions[session_id]
-            elif game.is_game_over:
-                game_status = f"没有人猜出答案啊Σ(°△°|||)︴\n正确答案是“{game.answer}”，意思是“{explanation}”。"
-                del self.game_sessions[session_id]
+                        f"游戏开始！请输入长度为{length}的单词。",
+                        f"游戏开始了！请输入长度为{length}的单词。",
+                        f"游戏开始了！请输入长度为{length}的单词。"
+                    ])
+            elif not user_length_ok:
+                random_text = random.choice([
+                        f"不清楚你想猜多长的单词，那就{length}个字母的吧！",
+                        f"你想猜多长的单词？长度{length}如何？游戏开始！",
+                        f"不明白你的意思，但是，游戏开始！请输入长度为{length}的单词。",
+                        f"单词长度{length}如何？游戏开始，请输入！",
+                    ])
+            yield event.plain_result(random_text)
+
+    async def handle_guess(self, event: AstrMessageEvent, msg: str):
+        session_id = self.session_key(event)
+        if session_id not in self.game_sessions or not event.is_at_or_wake_command:
+            return
+        game = self.game_sessions[session_id]
+
+        length = game.length
+
+        if not msg.isalpha():
+            random_text = random.choice([
+            "你要输入英语才行啊😉！",
+            "语言不正确哦，要输入英语单词。",
+            "我以后就可以用其他语言猜单词了，不过现在还是用英语吧！",
+            "Try in English💬!", 
+            "需要英文单词～🔡",  
+            "Alphabet Only!🔤", 
+            "外星挑战：地球英文输入🛸。", 
+            "符号错误🔣，需要纯字母。", 
+            "❗Error: Expected ENGLISH :("
+        ])
+            random_text = random_text + "\n输入“猜单词结束”就可以结束游戏，输入“猜单词提示”可以获得提示。"
+            yield event.plain_result(random_text)
+            return
+
+        elif len(msg) != length:
+            random_text = random.choice([
+            f"你要输入{length}字母的英语单词才行啊😉！",
+            f"不太对哦，要输入{length}个字母的英语单词🔡。",
+            f"Traceback (most recent call last):\n  File \"\<wordle\>\", line 114, in \<module\>\nSpellError: I need {length}-letter English words! :(",
+            f"需要{length}个字母长的英语单词～🔡", 
+            f"输入有问题！请输入{length}个字母长的英语单词。",
+            f"回答错误❌！应该是有{length}个字母的英语单词。",
+            f"戳啦🌀！请输入{length}个字母的英语单词。"
+
+        ])
+            random_text = random_text + "\n输入“猜单词结束”就可以结束游戏，输入“猜单词提示”可以获得提示。"
+            yield event.plain_result(random_text)
+            return   
+
+        if not self.user_limiter.allow(event.get_sender_id()) or not self.session_limiter.allow(session_id):
+            METRICS.incr("guess_rate_limited")
+            yield event.plain_result("猜得太快啦，请稍等一会儿再猜。")
+            return
+
+        self.refresh_custom_words()
+        try:
+            await self.ensure_word_bank()
+        except RenderBusyError:
+            yield event.plain_result("现在猜单词的人太多了，请稍后再试。")
+            return
+        with METRICS.timer("validate"):
+            is_valid = self.validator.is_valid(msg)
+        if not is_valid:
+            random_text = random.choice([
+            "拼写错误😉！",
+            "拼错了哦，试试重新拼一下单词吧！",
+            "单词拼写不正确！",
+            "拼写有误🌀，再试一次吧！",
+            "（你确定这个单词存在吗😲？）",
+            "拼写错误，请检查拼写！",
+            ])
+            random_text = random_text + "\n输入“猜单词结束”就可以结束游戏，输入“猜单词提示”可以获得提示。"
+            yield event.plain_result(random_text)
+            return
+
+        # 同一会话的猜测依次校验和记录；等锁期间这局游戏可能已经被别人猜中、结束或换成了新的一局
+        # 锁内只计算回复，消息都在锁外发送，发送消息不会阻塞同一会话的其他猜测
+        async with self.game_sessions.lock(session_id):
+            if self.game_sessions.get(session_id) is not game or game.is_game_over or game.is_won:
+                return
+            duplicate = await game.is_guessed(msg)
+            if not duplicate:
+                game.record_guess(msg)
+                if game.puzzle is not None:
+                    self.daily.record(session_id, game.puzzle, game.guesses)
+                rows = len(game.guesses)
+                game_status = self.guess_status(event, session_id, game)
+        if duplicate:
+            yield event.plain_result("这个单词已经猜过了！")
+            return
+
+        # 同一会话的棋盘依次绘制；等待期间又有新的猜测时，这张棋盘已经过时，只发送文字，由最新的猜测发送棋盘
+        async with self.game_sessions.lock(session_id, "render"):
+            stale = len(game.guesses) > rows
+            if stale:
+                METRICS.incr("render_coalesced")
             else:
-                game_status = f"已猜测 {len(game.guesses)}/{game.max_attempts} 次。"
-                logger.info(f"已猜测 {len(game.guesses)}/{game.max_attempts} 次。")
-            
-            # 保证兼容性（从原作者那偷的），将png转为jpg
-            tem_id = session_id.replace(":","") # 删掉文件系统不兼容的符号
-            img_path_png = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)),
-                f"{tem_id}_{len(game.guesses)}_wordle.png",
-            )
-            img_path_jpg = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)),
-                f"{tem_id}_{len(game.guesses)}_wordle.jpg",
-            )
-
-            with open(img_path_png, "wb") as f:
-                f.write(image_result)
-
-            im = ImageW.open(img_path_png)
-            im = im.convert('RGB')
-            im.save(img_path_jpg, quality=95)
-            chain = [
-                Image.fromFileSystem(img_path_jpg),
-                Plain(game_status),
-            ]
+                try:
+                    image_result = await game.gen_image(rows)
+                except RenderBusyError:
+                    image_result = None  # 这次的猜测照常记录，只是不发送图片，下次绘制时会补上
+        if stale:
+            yield event.plain_result(game_status)
+            return
 
-            yield event.chain_result(chain)
+        if image_result is None:
+            yield event.plain_result(f"{game_status}\n（现在猜单词的人太多了，这次没有生成图片。）")
+            return
 
-            os.remove(img_path_png)
-            os.remove(img_path_jpg)
+        try:
+            image, tmp_file = await self.image_component(image_result)
+        except RenderBusyError:
+            yield event.plain_result(f"{game_status}\n（现在猜单词的人太多了，这次没有生成图片。）")
+            return
+        chain = [
+            image,
+            Plain(game_status),
+        ]
+        try:
+            yield event.chain_result(chain)
+        finally:
+            if tmp_file:
+                await self.remove_tmp_file(tmp_file)
+
+    def guess_status(self, event: AstrMessageEvent, session_id: str, game: WordleGame) -> str:
+        """记录猜测后的局面说明；游戏结束时同时移除会话"""
+        if game.is_won:
+            sender_info = event.get_sender_name() if event.get_sender_name() else event.get_sender_id()
+            random_text = random.choice([
+                "恭喜你猜对了😉！",
+                "Cool🎉！",
+                "答案正确✅！"
+                "太棒了🎉！", 
+                "猜中啦🎯！",  
+                "冠军🥇！", 
+                "天才🌟！", 
+                "胜利🏆！", 
+                "满分💯！", 
+                "王者👑！", 
+                "绝了🤩！"
+            ])
+            if random.randint(1,22) == 1:
+                random_text = "🔠🥳语言神，启动🔠🥳！"
+            game_status = f"{random_text}“{game.answer}”的意思是“{game.info.zh}”。"
+            if game.puzzle is not None:
+                self.daily.finish(session_id, game.puzzle)
+            del self.game_sessions[session_id]
+        elif game.is_game_over:
+            if game.puzzle is not None:
+                self.daily.finish(session_id, game.puzzle)
+                game_status = "次数用完了Σ(°△°|||)︴\n其他人还在挑战，答案就不公布啦，明天再来吧！"
+            else:
+                game_status = f"没有人猜出答案啊Σ(°△°|||)︴\n正确答案是“{game.answer}”，意思是“{game.info.zh}”。"
+            del self.game_sessions[session_id]
+        else:
+            game_status = f"已猜测 {len(game.guesses)}/{game.max_attempts} 次。"
+            logger.info(f"已猜测 {len(game.guesses)}/{game.max_attempts} 次。")
+        return game_status